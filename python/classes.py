@@ -1,7 +1,343 @@
+import importlib.util
+import os
+import sys
+import zipfile
+
 import numpy as np
 import trimesh
 import matplotlib.pyplot as plt
 
+# The LOD, slice-viewer and memory helpers live in the sibling
+# surface-roughness package, which is not installed as a distribution.
+_SURFACE_ROUGHNESS_SRC = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "surface-roughness", "src"
+)
+
+# Bytes per grid cell of the full point cloud: the three meshgrid arrays plus
+# the (N, 3) float64 points built from them.
+_POINT_BYTES = 48
+# Boolean AABB masks and candidate indices per point inside label_domain.
+_MASK_BYTES = 16
+# Rough throughputs for VolumeBuilder.estimate (order of magnitude only).
+_AABB_POINTS_PER_S = 1.0e8
+_CONTAINS_POINTS_PER_S = 2.0e5
+_SAT_TESTS_PER_S = 2.0e7
+_WINDING_POINTS_PER_S = 1.0e5
+# Supersample points classified per batch by material_fractions without a
+# memory budget; mesh point tests ("contains", "winding") get the smaller one.
+_FRACTION_BATCH = 2**20
+_FRACTION_BATCH_MESH = 2**16
+# Rough temporaries per supersample point: point tables, owners and labels,
+# or a trimesh ray / winding-number point test (order of magnitude only).
+_FRACTION_POINT_BYTES = 64
+_FRACTION_MESH_POINT_BYTES = 2**14
+# Triangle-cell pairs tested per batch by the surface voxelizer.
+_SURFACE_BATCH = 2**22
+
+# Per-object labeling methods (see VolumeBuilder `methods`).
+_METHODS = ("aabb", "contains", "heightfield", "surface", "winding")
+
+
+def _cell_edges(points, spacing=None):
+    """
+    Cell boundaries of a monotone axis; each point is centred in its cell.
+    
+    Interior edges are the midpoints between neighbouring points; the end
+    cells extend by half the adjacent spacing (or *spacing* for a
+    single-point axis).
+    """
+    if len(points) == 1:
+        return np.array([points[0] - 0.5 * spacing, points[0] + 0.5 * spacing])
+    mid = 0.5 * (points[1:] + points[:-1])
+    return np.concatenate((
+        [points[0] - 0.5 * (points[1] - points[0])],
+        mid,
+        [points[-1] + 0.5 * (points[-1] - points[-2])],
+    ))
+
+
+def _surface_roughness():
+    """
+    Import surface_roughness, putting the sibling source tree on sys.path.
+    
+    Raises ImportError (with the expected location) when neither an
+    installed copy nor python/surface-roughness/src is available.
+    """
+    if os.path.isdir(_SURFACE_ROUGHNESS_SRC) and _SURFACE_ROUGHNESS_SRC not in sys.path:
+        sys.path.append(_SURFACE_ROUGHNESS_SRC)
+    try:
+        import surface_roughness
+    except ImportError as err:
+        raise ImportError(
+            f"surface_roughness is required here; expected it installed or at "
+            f"{_SURFACE_ROUGHNESS_SRC} ({err})."
+        ) from err
+    return surface_roughness
+
+
+def _memory_module():
+    """
+    surface_roughness's memory helpers without importing the package.
+    
+    Returns the already-imported module when the package is loaded (so its
+    global budget is shared), else executes memory.py on its own; it only
+    needs NumPy.
+    """
+    module = sys.modules.get("surface_roughness.classes.memory")
+    if module is not None:
+        return module
+    path = os.path.join(_SURFACE_ROUGHNESS_SRC, "surface_roughness", "classes", "memory.py")
+    if not os.path.isfile(path):
+        raise ImportError(f"surface_roughness memory helpers not found at {path}.")
+    spec = importlib.util.spec_from_file_location("_surface_roughness_memory", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _tri_box_overlap(tri, centre, half):
+    """
+    Separating-axis test for N (triangle, axis-aligned box) pairs.
+    
+    Parameters
+    ----------
+    tri : ndarray, shape (N, 3, 3)
+        Triangle vertices.
+    centre, half : ndarray, shape (N, 3)
+        Box centres and half-sizes.
+    
+    Returns
+    -------
+    overlap : ndarray of bool, shape (N,)
+        True where the triangle touches or intersects the box.
+    """
+    v = tri - centre[:, None, :]
+    edges = v[:, [1, 2, 0]] - v
+    
+    # Box face normals: bounding-box overlap
+    hit = ((v.min(axis=1) <= half) & (v.max(axis=1) >= -half)).all(axis=1)
+    
+    # Triangle normal
+    normal = np.cross(edges[:, 0], edges[:, 1])
+    dist = np.einsum("ij,ij->i", normal, v[:, 0])
+    hit &= np.abs(dist) <= np.einsum("ij,ij->i", half, np.abs(normal))
+    
+    # Cross products of the box axes with the triangle edges
+    for k in range(3):
+        for j in range(3):
+            axis = np.zeros_like(centre)
+            axis[:, (k + 1) % 3] = -edges[:, j, (k + 2) % 3]
+            axis[:, (k + 2) % 3] = edges[:, j, (k + 1) % 3]
+            proj = np.einsum("nij,nj->ni", v, axis)
+            radius = np.einsum("ij,ij->i", half, np.abs(axis))
+            hit &= (proj.min(axis=1) <= radius) & (proj.max(axis=1) >= -radius)
+    return hit
+
+
+class _WindingTree:
+    """
+    Fast generalized winding numbers of a triangle soup (Barnes-Hut style).
+    
+    Triangles are sorted into a median-split bounding hierarchy.  For a
+    query point far from a node (distance > beta * node radius) the node's
+    triangles are replaced by a single dipole, the sum of their area
+    vectors at their area-weighted centre; near leaves are summed exactly
+    with the Van Oosterom-Strackee solid angle.  The winding number is ~1
+    inside and ~0 outside a closed, outward-oriented mesh and degrades
+    gracefully across holes, gaps and small self-intersections.
+    
+    Parameters
+    ----------
+    triangles : ndarray, shape (F, 3, 3)
+    leaf_size : int, optional
+        Maximum number of triangles per leaf.
+    beta : float, optional
+        Far-field acceptance ratio; larger is more accurate and slower.
+    """
+    
+    def __init__(self, triangles, leaf_size=8, beta=2.0):
+        tri = np.asarray(triangles, dtype=float)
+        self.beta = beta
+        centroid = tri.mean(axis=1)
+        
+        order = np.arange(len(tri))
+        start, count, left, right = [], [], [], []
+        stack = [(0, len(tri), -1, 0)]   # (start, stop, parent, side)
+        while stack:
+            s, e, parent, side = stack.pop()
+            node = len(start)
+            start.append(s)
+            count.append(e - s)
+            left.append(-1)
+            right.append(-1)
+            if parent >= 0:
+                (left if side == 0 else right)[parent] = node
+            if e - s <= leaf_size:
+                continue
+            c = centroid[order[s:e]]
+            axis = np.ptp(c, axis=0).argmax()
+            mid = (e - s) // 2
+            part = np.argpartition(c[:, axis], mid)
+            order[s:e] = order[s:e][part]
+            stack.append((s + mid, e, node, 1))
+            stack.append((s, s + mid, node, 0))
+        
+        self.tri = tri[order]
+        self.start = np.array(start)
+        self.count = np.array(count)
+        self.left = np.array(left)
+        self.right = np.array(right)
+        
+        # Node moments from prefix sums over the reordered triangles
+        area_vec = 0.5 * np.cross(self.tri[:, 1] - self.tri[:, 0],
+                                  self.tri[:, 2] - self.tri[:, 0])
+        area = np.linalg.norm(area_vec, axis=1)
+        stop = self.start + self.count
+        
+        def _range_sum(values):
+            csum = np.concatenate([np.zeros((1,) + values.shape[1:]),
+                                   np.cumsum(values, axis=0)])
+            return csum[stop] - csum[self.start]
+        
+        node_area = _range_sum(area)
+        weighted = _range_sum(area[:, None] * self.tri.mean(axis=1))
+        plain = _range_sum(self.tri.mean(axis=1)) / self.count[:, None]
+        safe = np.where(node_area > 0, node_area, 1.0)[:, None]
+        self.centre = np.where(node_area[:, None] > 0, weighted / safe, plain)
+        self.dipole = _range_sum(area_vec)
+        
+        # Radius: farthest vertex of the node from its centre
+        owner = np.repeat(np.arange(len(self.start)), self.count)
+        members = np.arange(self.count.sum()) - np.repeat(
+            np.cumsum(self.count) - self.count, self.count
+        ) + self.start[owner]
+        dist = np.linalg.norm(self.tri[members] - self.centre[owner][:, None],
+                              axis=2).max(axis=1)
+        self.radius = np.zeros(len(self.start))
+        np.maximum.at(self.radius, owner, dist)
+    
+    @staticmethod
+    def _solid_angle(tri, q):
+        """Signed solid angle of triangles (N, 3, 3) seen from points (N, 3)."""
+        a, b, c = (tri[:, i] - q for i in range(3))
+        la, lb, lc = (np.linalg.norm(x, axis=1) for x in (a, b, c))
+        det = np.einsum("ij,ij->i", a, np.cross(b, c))
+        den = (la * lb * lc + np.einsum("ij,ij->i", a, b) * lc
+               + np.einsum("ij,ij->i", b, c) * la
+               + np.einsum("ij,ij->i", c, a) * lb)
+        return 2.0 * np.arctan2(det, den)
+    
+    def winding_number(self, points, chunk=65536):
+        """
+        Generalized winding number at each of (N, 3) points.
+        """
+        points = np.asarray(points, dtype=float)
+        out = np.zeros(len(points))
+        for c0 in range(0, len(points), chunk):
+            q = points[c0:c0 + chunk]
+            w = np.zeros(len(q))
+            pi = np.arange(len(q))
+            ni = np.zeros(len(q), dtype=np.int64)
+            while pi.size:
+                d = self.centre[ni] - q[pi]
+                dist = np.linalg.norm(d, axis=1)
+                far = dist > self.beta * self.radius[ni]
+                if far.any():
+                    flux = np.einsum("ij,ij->i", self.dipole[ni[far]], d[far])
+                    w += np.bincount(pi[far], weights=flux / dist[far]**3,
+                                     minlength=len(q))
+                
+                leaf = ~far & (self.left[ni] < 0)
+                if leaf.any():
+                    lp, ln = pi[leaf], ni[leaf]
+                    n = self.count[ln]
+                    rep = np.repeat(np.arange(lp.size), n)
+                    t = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+                    omega = self._solid_angle(self.tri[self.start[ln][rep] + t],
+                                              q[lp[rep]])
+                    w += np.bincount(lp[rep], weights=omega, minlength=len(q))
+                
+                inner = ~far & ~leaf
+                pi = np.concatenate([pi[inner], pi[inner]])
+                ni = np.concatenate([self.left[ni[inner]], self.right[ni[inner]]])
+            out[c0:c0 + chunk] = w / (4.0 * np.pi)
+        return out
+
+
+def _npz_arrays(path, mmap=True):
+    """
+    Arrays of an .npz archive, memory-mapped where stored uncompressed.
+    
+    np.load ignores mmap_mode for archives, so each member's .npy header
+    is located in the zip and mapped directly; compressed members are
+    read normally.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            key = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if not mmap or info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as member:
+                    arrays[key] = np.lib.format.read_array(member)
+                continue
+            # Local file header: 30 fixed bytes, then name and extra field
+            f.seek(info.header_offset + 26)
+            n_name, n_extra = np.frombuffer(f.read(4), dtype="<u2")
+            f.seek(info.header_offset + 30 + int(n_name) + int(n_extra))
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"{path}: member {key!r} holds Python objects.")
+            arrays[key] = np.memmap(f.name, dtype=dtype, mode="r", offset=f.tell(),
+                                    shape=shape, order="F" if fortran else "C")
+    return arrays
+
+
+def load_scene_npz(path, mmap=True, obj_axes=True):
+    """
+    Meshes and material parameters from a mesh_panel binary scene export.
+    
+    The archive (written by the "Export Binary Scene" operator) holds the
+    evaluated vertices and triangles of every simulation object,
+    concatenated with per-object offsets, plus world matrices and
+    density, porosity and permeability; nothing is parsed as text.
+    
+    Parameters
+    ----------
+    path : str
+    mmap : bool, optional
+        Memory-map the arrays instead of reading them.
+    obj_axes : bool, optional
+        Convert Blender's Z-up world to the Y-up axes of the default OBJ
+        export, (x, y, z) -> (x, z, -y), so grids stay in OBJ coordinates.
+    
+    Returns
+    -------
+    geoms : dict
+        Object name -> trimesh.Trimesh in world (OBJ) coordinates.
+    params : dict
+        Object name -> {'density', 'porosity', 'permeability'}.
+    """
+    arrays = _npz_arrays(path, mmap=mmap)
+    vo, to = arrays["vertex_offsets"], arrays["triangle_offsets"]
+    axes = np.array([[1.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.0, -1.0, 0.0]])
+    geoms, params = {}, {}
+    for n, name in enumerate(arrays["names"]):
+        name = str(name)
+        matrix = np.asarray(arrays["matrices"][n], dtype=float)
+        if obj_axes:
+            matrix = np.vstack((axes @ matrix[:3], matrix[3]))
+        local = np.asarray(arrays["vertices"][vo[n]:vo[n + 1]], dtype=float)
+        vertices = local @ matrix[:3, :3].T + matrix[:3, 3]
+        faces = np.asarray(arrays["triangles"][to[n]:to[n + 1]], dtype=np.int64)
+        geoms[name] = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+        params[name] = {key: float(arrays[key][n])
+                        for key in ("density", "porosity", "permeability")}
+    return geoms, params
+
 
 class VolumeBuilder:
     """
@@ -10,14 +346,60 @@ class VolumeBuilder:
     Parameters
     ----------
     obj_path : str
-        Path to the OBJ file.
+        Path to the OBJ file, or to a binary scene .npz from mesh_panel's
+        "Export Binary Scene" (see `load_scene_npz`; its material
+        parameters land in `material_params`).
     priority : dict
         Dict mapping group names to priority (higher = later overwrite).
         Example: {"ice": 0, "air": 1, "base": 2, "heterogeneity": 3}
     x_min, x_max, dx : float
     y_min, y_max, dy : float
     z_min, z_max, dz : float
-        Grid extents and spacings in OBJ coordinates.
+        Grid extents and spacings in OBJ coordinates.  Ignored (pass None)
+        when *axes* is given.
+    background_label : int, optional
+        Label for cells not covered by any object.
+    memory_budget : int or str, optional
+        Limit for the point cloud and mask temporaries, in bytes or as a
+        string such as ``"2GiB"`` (see surface_roughness's
+        ``parse_bytes``).  When the full (nx*ny*nz, 3) point array would
+        exceed it, ``label_domain`` generates and labels points one x-slab
+        at a time.  ``None`` uses the global budget from
+        ``surface_roughness.set_memory_budget``, or no limit when that is
+        unset or the package is unavailable.
+    lattice_fill : bool, optional
+        Label grid-aligned voxel meshes (e.g. from ``geometry_to_obj``) by
+        parity fill along z-columns instead of AABB / ``contains`` tests.
+        Exact when the grid points are the cell centres of the exported
+        grid, e.g. ``x_min = dx / 2``, ``x_max = (nx - 0.5) * dx``.
+        Objects whose method is ``"surface"`` or ``"heightfield"`` are
+        never parity filled.
+    methods : dict, optional
+        Labeling method per priority tag:
+        
+        * ``"aabb"`` – every grid point inside the object's bounding box
+          (exact for axis-aligned boxes);
+        * ``"contains"`` – ``trimesh`` point containment (closed meshes);
+        * ``"surface"`` – conservative surface voxelization: every cell a
+          triangle touches, for thin, open or non-manifold shells;
+        * ``"winding"`` – generalized winding number > 0.5, for solids that
+          are almost but not quite watertight;
+        * ``"heightfield"`` – fill each vertical column between the lowest
+          and highest crossing of the mesh (one ray per column), for
+          layers bounded by height fields such as a bed or an ice/air
+          boundary.
+        
+        Defaults to ``{"heterogeneity": "contains"}`` with ``"aabb"`` for
+        all other tags.
+    axes : tuple of 3 array_like, optional
+        Explicit, strictly increasing grid point coordinates ``(xs, ys,
+        zs)`` for stretched grids, e.g. fine cells near the bed and coarse
+        cells in the air.  Cell boundaries lie halfway between points.
+        See also `from_axes`.
+    vertical_axis : int, optional
+        Axis of the vertical rays used by `heightfield` and the
+        ``"heightfield"`` method: 2 (z-up, as for ``voxelize_surface``) or
+        1 for Y-up OBJ exports.
     """
     
     def __init__(
@@ -27,39 +409,141 @@ class VolumeBuilder:
             x_min, x_max, dx,
             y_min, y_max, dy,
             z_min, z_max, dz,
-            background_label=0
+            background_label=0,
+            memory_budget=None,
+            lattice_fill=True,
+            methods=None,
+            axes=None,
+            vertical_axis=2,
         ):
         self.obj_path = obj_path
         self.priority = priority
         self.background_label = background_label
+        self.memory_budget = memory_budget
+        # Explicit budget in bytes, parsed once; None defers to the global budget
+        if isinstance(memory_budget, str):
+            self._budget_bytes = _memory_module().parse_bytes(memory_budget)
+        else:
+            self._budget_bytes = None if memory_budget is None else int(memory_budget)
+        self.lattice_fill = lattice_fill
+        self.vertical_axis = vertical_axis
+        self.methods = {"heterogeneity": "contains"} if methods is None else dict(methods)
+        for tag, method in self.methods.items():
+            if method not in _METHODS:
+                raise ValueError(f"Unknown method {method!r} for tag {tag!r}; "
+                                 f"expected one of {_METHODS}.")
         
         # Load scene
-        scene = trimesh.load(self.obj_path, process=False)
-        if isinstance(scene, trimesh.Scene):
-            self.geoms = scene.geometry  # dict: name -> Trimesh [web:70][web:75]
+        self.material_params = {}
+        if str(self.obj_path).lower().endswith(".npz"):
+            self.geoms, self.material_params = load_scene_npz(self.obj_path)
         else:
-            self.geoms = {"mesh": scene}
+            scene = trimesh.load(self.obj_path, process=False)
+            if isinstance(scene, trimesh.Scene):
+                self.geoms = scene.geometry  # dict: name -> Trimesh [web:70][web:75]
+            else:
+                self.geoms = {"mesh": scene}
         
         # Build grid
-        self.xs = np.arange(x_min, x_max + 0.5 * dx, dx)
-        self.ys = np.arange(y_min, y_max + 0.5 * dy, dy)
-        self.zs = np.arange(z_min, z_max + 0.5 * dz, dz)
+        if axes is None:
+            self.xs = np.arange(x_min, x_max + 0.5 * dx, dx)
+            self.ys = np.arange(y_min, y_max + 0.5 * dy, dy)
+            self.zs = np.arange(z_min, z_max + 0.5 * dz, dz)
+            spacing = (dx, dy, dz)
+        else:
+            self.xs, self.ys, self.zs = (np.asarray(a, dtype=float) for a in axes)
+            for name, axis in zip("xyz", (self.xs, self.ys, self.zs)):
+                if axis.ndim != 1 or len(axis) < 2 or not (np.diff(axis) > 0).all():
+                    raise ValueError(f"{name}s must be strictly increasing with "
+                                     f"at least 2 points.")
+            spacing = (None, None, None)
         
         self.nx, self.ny, self.nz = len(self.xs), len(self.ys), len(self.zs)
+        self.axes = (self.xs, self.ys, self.zs)
+        # Cell edges: each grid point sits at the centre of its cell
+        self.edges = [
+            _cell_edges(axis, d)
+            for axis, d in zip((self.xs, self.ys, self.zs), spacing)
+        ]
         
-        X, Y, Z = np.meshgrid(self.xs, self.ys, self.zs, indexing="ij")
-        self.points = np.column_stack((X.ravel(), Y.ravel(), Z.ravel()))
-        self.labels_1d = np.full(self.points.shape[0],
+        # Point cloud is built on first use (see `points`)
+        self._points = None
+        self.labels_1d = np.full(self.nx * self.ny * self.nz,
                                  self.background_label,
                                  dtype=np.int32)
         self.label_grid = None
+        self.fractions = None
+        self._lod = {}   # level -> majority-vote preview of label_grid
         
         # Precompute label map per object name
         self.label_for_name = self._build_label_map()
     
+    @classmethod
+    def from_axes(cls, obj_path, priority, xs, ys, zs, **kwargs):
+        """
+        Builder on explicit (possibly stretched) grid axes.
+        
+        Parameters
+        ----------
+        obj_path, priority
+            As for the constructor.
+        xs, ys, zs : array_like
+            Strictly increasing grid point coordinates.
+        **kwargs
+            Other constructor options.
+        """
+        return cls(obj_path, priority, None, None, None, None, None, None,
+                   None, None, None, axes=(xs, ys, zs), **kwargs)
+    
+    @property
+    def points(self):
+        """(nx*ny*nz, 3) cell-centre coordinates, built on first access."""
+        if self._points is None:
+            self._points = self._slab_points(0, self.nx)
+        return self._points
+    
     # -------------------------
     # internal helpers
     # -------------------------
+    def _slab_points(self, i0, i1):
+        """Points of x-slab [i0, i1) in the same (C) order as labels_1d."""
+        X, Y, Z = np.meshgrid(self.xs[i0:i1], self.ys, self.zs, indexing="ij")
+        return np.column_stack((X.ravel(), Y.ravel(), Z.ravel()))
+    
+    def _slab_step(self, cells_per_slice=None):
+        """x-slab thickness that keeps point temporaries within budget."""
+        if cells_per_slice is None:
+            cells_per_slice = self.ny * self.nz
+        per_slice = (_POINT_BYTES + _MASK_BYTES) * max(cells_per_slice, 1)
+        budget = self._budget()
+        if budget is None:
+            return self.nx
+        return int(min(self.nx, max(1, budget // per_slice)))
+    
+    def _budget(self):
+        """
+        Byte budget: memory_budget, else the global budget.
+        
+        The global budget is read only if surface_roughness is already
+        loaded; set_memory_budget cannot have been called otherwise.
+        """
+        if self._budget_bytes is not None:
+            return self._budget_bytes
+        memory = sys.modules.get("surface_roughness.classes.memory")
+        return None if memory is None else memory.get_memory_budget()
+    
+    def _index_ranges(self, bounds_min, bounds_max):
+        """
+        Half-open (start, stop) index range per axis of the grid points
+        inside the box [bounds_min, bounds_max].
+        """
+        return [
+            (np.searchsorted(axis, lo, side="left"),
+             np.searchsorted(axis, hi, side="right"))
+            for axis, lo, hi in zip((self.xs, self.ys, self.zs),
+                                    bounds_min, bounds_max)
+        ]
+    
     def _match_tag(self, name: str):
         """
         Find which priority tag applies to this geometry name.
@@ -84,6 +568,12 @@ class VolumeBuilder:
             return -1  # lowest
         return self.priority[tag]
     
+    def _get_method_for_name(self, name: str) -> str:
+        """
+        Labeling method for a geometry name (see `methods`).
+        """
+        return self.methods.get(self._match_tag(name), "aabb")
+    
     def _get_label_for_name(self, name: str) -> int:
         """
         Label ID = priority value associated with matched tag.
@@ -112,6 +602,368 @@ class VolumeBuilder:
                 label_for_name[name] = 99   # fallback
         return label_for_name
     
+    # -------------------------
+    # voxel-mesh fast path
+    # -------------------------
+    
+    def _edge_position(self, axis, coords):
+        """
+        Continuous cell-edge index of *coords* along *axis*.
+        
+        Edge m (between grid points m - 1 and m) maps to m; positions are
+        extrapolated linearly with the end spacings beyond the grid.
+        """
+        e = self.edges[axis]
+        pos = np.interp(coords, e, np.arange(len(e), dtype=float))
+        below, above = coords < e[0], coords > e[-1]
+        pos[below] = (coords[below] - e[0]) / (e[1] - e[0])
+        pos[above] = len(e) - 1 + (coords[above] - e[-1]) / (e[-1] - e[-2])
+        return pos
+    
+    def _lattice_coords(self, mesh):
+        """
+        Vertex lattice coordinates, or None if the mesh is not grid-aligned.
+        
+        Grid point i maps to 2i and the cell edge below it to 2i - 1, so
+        grid points are even and cell faces odd on every axis, uniform or
+        stretched.  A mesh is grid-aligned when every vertex lies on cell
+        faces and every triangle lies in an axis-aligned plane.
+        """
+        if len(mesh.faces) == 0:
+            return None
+        vertices = np.asarray(mesh.vertices, dtype=float)
+        u = np.stack([
+            2.0 * self._edge_position(a, vertices[:, a]) - 1.0 for a in range(3)
+        ], axis=1)
+        lattice = np.rint(u)
+        if np.abs(u - lattice).max() > 1e-3:
+            return None
+        lattice = lattice.astype(np.int64)
+        if not (lattice % 2).all():
+            return None
+        tri = lattice[mesh.faces]
+        planar = (tri[:, 0] == tri[:, 1]) & (tri[:, 0] == tri[:, 2])
+        if not planar.any(axis=1).all():
+            return None
+        return lattice
+    
+    def _z_crossings(self, lattice, faces, i0, i1):
+        """
+        Columns (i, j) in x-slab [i0, i1) crossed by horizontal triangles.
+        
+        Returns (i, j, k) where k is the number of grid points below the
+        crossing (clipped to [0, nz]).  A column through a shared triangle
+        edge is counted for exactly one of the two triangles.
+        """
+        tri = lattice[faces]
+        horizontal = (tri[:, 0, 2] == tri[:, 1, 2]) & (tri[:, 0, 2] == tri[:, 2, 2])
+        tri = tri[horizontal]
+        a, b, c = tri[:, 0, :2], tri[:, 1, :2], tri[:, 2, :2]
+        area = ((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1])
+                - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]))
+        flip = area < 0
+        b[flip], c[flip] = c[flip], b[flip].copy()
+        keep = area != 0
+        a, b, c, kz = a[keep], b[keep], c[keep], tri[keep, 0, 2]
+        
+        # Candidate grid points (2i, 2j) inside each triangle's bounding box
+        lo = -(-np.minimum(np.minimum(a, b), c) // 2)
+        hi = np.maximum(np.maximum(a, b), c) // 2
+        lo = np.maximum(lo, [i0, 0])
+        hi = np.minimum(hi, [i1 - 1, self.ny - 1])
+        extent = np.clip(hi - lo + 1, 0, None)
+        counts = extent[:, 0] * extent[:, 1]
+        tid = np.repeat(np.arange(len(counts)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        ci = lo[tid, 0] + local // extent[tid, 1]
+        cj = lo[tid, 1] + local % extent[tid, 1]
+        
+        inside = np.ones(len(tid), dtype=bool)
+        for p, q in ((a, b), (b, c), (c, a)):
+            e = (q - p)[tid]
+            edge = e[:, 0] * (2 * cj - p[tid, 1]) - e[:, 1] * (2 * ci - p[tid, 0])
+            # Tie-break so a point on a shared edge belongs to one triangle
+            owns = (e[:, 1] < 0) | ((e[:, 1] == 0) & (e[:, 0] < 0))
+            inside &= (edge > 0) | ((edge == 0) & owns)
+        
+        k = np.clip((kz[tid[inside]] + 1) // 2, 0, self.nz)
+        return ci[inside], cj[inside], k
+    
+    def _lattice_closed(self, lattice, faces):
+        """
+        True if every grid column crosses the mesh an even number of times.
+        
+        A mesh with no horizontal crossings at all (e.g. a vertical sheet)
+        encloses nothing and is not considered closed.
+        """
+        ci, cj, _ = self._z_crossings(lattice, faces, 0, self.nx)
+        if ci.size == 0:
+            return False
+        parity = np.bincount(ci * self.ny + cj, minlength=self.nx * self.ny) & 1
+        return not parity.any()
+    
+    def _lattice_inside(self, lattice, faces, flat):
+        """
+        Parity test of a closed grid-aligned mesh at the cells *flat*.
+        
+        A cell is inside when an odd number of crossings lie below its grid
+        point in its column.
+        """
+        ci, cj, k = self._z_crossings(lattice, faces, 0, self.nx)
+        keys = np.sort((ci * self.ny + cj) * (self.nz + 1) + k)
+        i, j, kq = np.unravel_index(flat, (self.nx, self.ny, self.nz))
+        base = (i * self.ny + j) * (self.nz + 1)
+        below = (np.searchsorted(keys, base + kq, side="right")
+                 - np.searchsorted(keys, base, side="left"))
+        return (below & 1).astype(bool)
+    
+    def _lattice_label(self, lattice, faces, label):
+        """
+        Parity-fill a closed grid-aligned mesh into labels_1d.
+        
+        Returns the number of labeled cells, or None (nothing written) if
+        some column is crossed an odd number of times, i.e. the mesh is not
+        closed over the grid.
+        """
+        if not self._lattice_closed(lattice, faces):
+            return None
+        
+        n_inside = 0
+        step = self._slab_step()
+        for i0 in range(0, self.nx, step):
+            i1 = min(i0 + step, self.nx)
+            ci, cj, k = self._z_crossings(lattice, faces, i0, i1)
+            shape = (i1 - i0, self.ny, self.nz + 1)
+            idx = np.ravel_multi_index((ci - i0, cj, k), shape)
+            flips = (np.bincount(idx, minlength=np.prod(shape)) & 1).astype(np.uint8)
+            inside = np.bitwise_xor.accumulate(flips.reshape(shape), axis=2)
+            inside = inside[:, :, :self.nz].ravel().astype(bool)
+            offset = i0 * self.ny * self.nz
+            self.labels_1d[offset:offset + inside.size][inside] = label
+            n_inside += int(inside.sum())
+        return n_inside
+    
+    # -------------------------
+    # conservative surface voxelization
+    # -------------------------
+    
+    def _cell_range(self, axis, lo, hi):
+        """
+        First and last index of the cells on *axis* overlapping [lo, hi].
+        
+        Empty ranges come back with last < first.
+        """
+        e = self.edges[axis]
+        first = np.searchsorted(e[1:], lo, side="left")
+        last = np.searchsorted(e[:-1], hi, side="right") - 1
+        return first, last
+    
+    def _surface_candidates(self, tri):
+        """
+        Candidate cells (N, 3) and their triangle index for a triangle batch.
+        
+        Each triangle is swept over the cells of its bounding box along its
+        two minor normal axes; along the dominant axis only the cells its
+        plane can reach within that column are kept.
+        """
+        normal = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+        dominant = np.abs(normal).argmax(axis=1)
+        tmin, tmax = tri.min(axis=1), tri.max(axis=1)
+        
+        cells, owner = [], []
+        for w in range(3):
+            sel = np.flatnonzero(dominant == w)
+            if sel.size == 0:
+                continue
+            u, v = (w + 1) % 3, (w + 2) % 3
+            ulo, uhi = self._cell_range(u, tmin[sel, u], tmax[sel, u])
+            vlo, vhi = self._cell_range(v, tmin[sel, v], tmax[sel, v])
+            nu = np.clip(uhi - ulo + 1, 0, None)
+            nv = np.clip(vhi - vlo + 1, 0, None)
+            ncol = nu * nv
+            t = np.repeat(np.arange(sel.size), ncol)
+            local = np.arange(ncol.sum()) - np.repeat(np.cumsum(ncol) - ncol, ncol)
+            cu = ulo[t] + local // nv[t]
+            cv = vlo[t] + local % nv[t]
+            
+            # Range of the triangle's plane along w over each column's box
+            eu, ev = self.edges[u], self.edges[v]
+            uc, hu = 0.5 * (eu[cu] + eu[cu + 1]), 0.5 * (eu[cu + 1] - eu[cu])
+            vc, hv = 0.5 * (ev[cv] + ev[cv + 1]), 0.5 * (ev[cv + 1] - ev[cv])
+            n = normal[sel[t]]
+            p0 = tri[sel[t], 0]
+            wc = p0[:, w] - (n[:, u] * (uc - p0[:, u]) + n[:, v] * (vc - p0[:, v])) / n[:, w]
+            r = (np.abs(n[:, u]) * hu + np.abs(n[:, v]) * hv) / np.abs(n[:, w])
+            wlo, whi = self._cell_range(
+                w,
+                np.maximum(wc - r, tmin[sel[t], w]),
+                np.minimum(wc + r, tmax[sel[t], w]),
+            )
+            nw = np.clip(whi - wlo + 1, 0, None)
+            c = np.repeat(np.arange(t.size), nw)
+            local = np.arange(nw.sum()) - np.repeat(np.cumsum(nw) - nw, nw)
+            
+            ijk = np.empty((c.size, 3), dtype=np.int64)
+            ijk[:, u], ijk[:, v], ijk[:, w] = cu[c], cv[c], wlo[c] + local
+            cells.append(ijk)
+            owner.append(sel[t[c]])
+        if not cells:
+            return np.empty((0, 3), dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(cells), np.concatenate(owner)
+    
+    def _surface_cells(self, mesh):
+        """
+        Yield flat indices of the cells touched by *mesh*, batch by batch.
+        
+        Cells touched by triangles in several batches are repeated.
+        """
+        tris = np.asarray(mesh.triangles, dtype=float)
+        area = np.linalg.norm(np.cross(tris[:, 1] - tris[:, 0],
+                                       tris[:, 2] - tris[:, 0]), axis=1)
+        tris = tris[area > 0]
+        
+        # Batch triangles so candidate arrays stay bounded: estimate the
+        # candidates of each triangle from its projected area in cells
+        cell = np.array([np.diff(e).min() for e in self.edges])
+        extent = np.ptp(tris, axis=1) / cell + 2
+        cost = np.sort(extent, axis=1)[:, 1:].prod(axis=1) * 3
+        bounds = np.searchsorted(np.cumsum(cost), np.arange(0, cost.sum(), _SURFACE_BATCH))
+        bounds = np.unique(np.append(bounds, len(tris)))
+        
+        start = 0
+        for stop in bounds:
+            if stop <= start:
+                continue
+            ijk, owner = self._surface_candidates(tris[start:stop])
+            start = stop
+            if owner.size == 0:
+                continue
+            lo = np.stack([self.edges[a][ijk[:, a]] for a in range(3)], axis=1)
+            hi = np.stack([self.edges[a][ijk[:, a] + 1] for a in range(3)], axis=1)
+            hit = _tri_box_overlap(tris[owner], 0.5 * (lo + hi), 0.5 * (hi - lo))
+            yield np.ravel_multi_index(ijk[hit].T, (self.nx, self.ny, self.nz))
+    
+    def _surface_label(self, mesh, label):
+        """
+        Label every cell that a triangle of *mesh* touches.
+        
+        Returns the number of cells labeled (with repeats across batches).
+        """
+        n_cells = 0
+        for idx in self._surface_cells(mesh):
+            self.labels_1d[idx] = label
+            n_cells += idx.size
+        return n_cells
+    
+    # -------------------------
+    # height-field extraction
+    # -------------------------
+    
+    def _column_hits(self, triangles, axis):
+        """
+        Yield (column, coordinate) crossings of vertical rays with triangles.
+        
+        One ray runs along *axis* through every grid point of the other two
+        axes; column is the flat index into the (n_u, n_v) field over those
+        axes in increasing order.  Triangles seen edge-on are skipped.
+        """
+        u, v = (a for a in range(3) if a != axis)
+        pu, pv = self.axes[u], self.axes[v]
+        tri = np.asarray(triangles, dtype=float)
+        e1, e2 = tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0]
+        det = e1[:, u] * e2[:, v] - e2[:, u] * e1[:, v]
+        tri, e1, e2, det = (x[det != 0] for x in (tri, e1, e2, det))
+        
+        tol = 1e-9 * max(np.ptp(pu), np.ptp(pv), 1.0)
+        lo, hi = tri.min(axis=1) - tol, tri.max(axis=1) + tol
+        iu0, iu1 = np.searchsorted(pu, lo[:, u]), np.searchsorted(pu, hi[:, u], side="right")
+        iv0, iv1 = np.searchsorted(pv, lo[:, v]), np.searchsorted(pv, hi[:, v], side="right")
+        nu, nv = np.clip(iu1 - iu0, 0, None), np.clip(iv1 - iv0, 0, None)
+        cost = nu * nv
+        bounds = np.searchsorted(np.cumsum(cost), np.arange(0, cost.sum(), _SURFACE_BATCH))
+        for t0, t1 in zip(bounds, np.append(bounds[1:], len(cost))):
+            n = cost[t0:t1]
+            t = t0 + np.repeat(np.arange(t1 - t0), n)
+            local = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+            cu = iu0[t] + local // nv[t]
+            cv = iv0[t] + local % nv[t]
+            # Barycentric coordinates of the ray in the projected triangle
+            du, dv = pu[cu] - tri[t, 0, u], pv[cv] - tri[t, 0, v]
+            a = (du * e2[t, v] - e2[t, u] * dv) / det[t]
+            b = (e1[t, u] * dv - du * e1[t, v]) / det[t]
+            eps = 1e-9
+            hit = (a >= -eps) & (b >= -eps) & (a + b <= 1 + eps)
+            h = tri[t, 0, axis] + a * e1[t, axis] + b * e2[t, axis]
+            yield cu[hit] * len(pv) + cv[hit], h[hit]
+    
+    def _column_span(self, mesh, axis):
+        """Lowest and highest crossing per column (NaN where no ray hits)."""
+        u, v = (a for a in range(3) if a != axis)
+        size = len(self.axes[u]) * len(self.axes[v])
+        bottom, top = np.full(size, np.nan), np.full(size, np.nan)
+        for col, h in self._column_hits(mesh.triangles, axis):
+            np.fmin.at(bottom, col, h)
+            np.fmax.at(top, col, h)
+        shape = (len(self.axes[u]), len(self.axes[v]))
+        return bottom.reshape(shape), top.reshape(shape)
+    
+    def heightfield(self, name, surface="top", axis=None, indices=False):
+        """
+        Rasterize object *name* as a height field, one vertical ray per column.
+        
+        Parameters
+        ----------
+        name : str
+            Object (OBJ group) name.
+        surface : {'top', 'bottom'}
+            Highest or lowest crossing of each ray with the mesh.
+        axis : int, optional
+            Vertical axis; defaults to `vertical_axis`.
+        indices : bool
+            Return fractional grid indices along *axis* instead of
+            coordinates, e.g. ``voxelize_surface(geometry, builder.heightfield(
+            "bed", indices=True), material_id=...)`` for z-up grids.
+        
+        Returns
+        -------
+        field : ndarray, shape (n_u, n_v)
+            Over the two other axes in increasing order; NaN where the ray
+            misses the mesh (fill these before stamping).
+        """
+        axis = self.vertical_axis if axis is None else axis
+        if surface not in ("top", "bottom"):
+            raise ValueError("surface must be 'top' or 'bottom'.")
+        bottom, top = self._column_span(self.geoms[name], axis)
+        field = top if surface == "top" else bottom
+        if indices:
+            points = self.axes[axis]
+            field = np.interp(field, points, np.arange(len(points), dtype=float),
+                              left=np.nan, right=np.nan)
+        return field
+    
+    def _heightfield_label(self, mesh, label):
+        """
+        Label grid points between the lowest and highest crossing of each
+        vertical column; returns the number of labeled cells.
+        """
+        axis = self.vertical_axis
+        bottom, top = self._column_span(mesh, axis)
+        points = self.axes[axis]
+        hit = ~np.isnan(bottom)
+        k0 = np.where(hit, np.searchsorted(points, np.nan_to_num(bottom), side="left"), 0)
+        k1 = np.where(hit, np.searchsorted(points, np.nan_to_num(top), side="right"), 0)
+        
+        grid = np.moveaxis(self.labels_1d.reshape((self.nx, self.ny, self.nz)), axis, -1)
+        K = np.arange(len(points))
+        step = self._slab_step(grid.shape[1] * grid.shape[2])
+        n_inside = 0
+        for a in range(0, grid.shape[0], step):
+            b = a + step
+            mask = (K >= k0[a:b, :, None]) & (K < k1[a:b, :, None])
+            grid[a:b][mask] = label
+            n_inside += int(mask.sum())
+        return n_inside
+    
     # -------------------------
     # main API
     # -------------------------
@@ -131,6 +983,7 @@ class VolumeBuilder:
             tag = self._match_tag(name)
             prio = self._get_priority_for_name(name)
             label = self._get_label_for_name(name)
+            method = self._get_method_for_name(name)
             
             if tag is None:
                 print(f"Skipping '{name}' (no priority tag match).")
@@ -138,35 +991,313 @@ class VolumeBuilder:
             
             print(f"Processing '{name}' tag='{tag}' label={label} priority={prio}")
             
-            bounds_min, bounds_max = mesh.bounds
-            
-            coarse = (
-                (self.points[:, 0] >= bounds_min[0]) & (self.points[:, 0] <= bounds_max[0]) &
-                (self.points[:, 1] >= bounds_min[1]) & (self.points[:, 1] <= bounds_max[1]) &
-                (self.points[:, 2] >= bounds_min[2]) & (self.points[:, 2] <= bounds_max[2])
-            )
+            # An explicit shell or height-field method takes precedence over
+            # the parity fill, which only makes sense for closed voxel meshes.
+            use_lattice = self.lattice_fill and method not in ("surface", "heightfield")
+            lattice = self._lattice_coords(mesh) if use_lattice else None
+            if lattice is not None:
+                n_inside = self._lattice_label(lattice, mesh.faces, label)
+                if n_inside is not None:
+                    print(f"  Voxel mesh: parity fill labeled {n_inside} cells")
+                    continue
+                print("  Voxel mesh is not closed; falling back to point tests.")
             
-            candidate_idx = np.where(coarse)[0]
-            if candidate_idx.size == 0:
-                print("  No points in bounding box; skipping.")
+            if method == "surface":
+                n_cells = self._surface_label(mesh, label)
+                print(f"  Surface: labeled {n_cells} cells touched by triangles")
+                continue
+            if method == "heightfield":
+                n_cells = self._heightfield_label(mesh, label)
+                print(f"  Height field: labeled {n_cells} cells between crossings")
                 continue
             
-            pts_candidate = self.points[candidate_idx]
+            # Grid points inside the bounding box form one index block
+            bounds_min, bounds_max = mesh.bounds
+            (i0, i1), (j0, j1), (k0, k1) = self._index_ranges(bounds_min, bounds_max)
+            n_coarse = max(i1 - i0, 0) * max(j1 - j0, 0) * max(k1 - k0, 0)
+            n_inside = 0
+            grid = self.labels_1d.reshape((self.nx, self.ny, self.nz))
             
-            # Example: treat "heterogeneity" as possibly rotated (needs contains),
-            # others as axis-aligned (AABB enough).
-            if tag == "heterogeneity":
-                inside_local = mesh.contains(pts_candidate)  # [web:82][web:114]
-                self.labels_1d[candidate_idx[inside_local]] = label
-                print(f"  Heterogeneity: coarse {candidate_idx.size}, inside {inside_local.sum()}")
+            # e.g. "heterogeneity" may be rotated (needs contains),
+            # others are axis-aligned (AABB enough).
+            if method == "aabb" and n_coarse:
+                grid[i0:i1, j0:j1, k0:k1] = label
+            elif n_coarse:
+                if method == "winding":
+                    tree = _WindingTree(mesh.triangles)
+                step = self._slab_step((j1 - j0) * (k1 - k0))
+                for a in range(i0, i1, step):
+                    b = min(a + step, i1)
+                    X, Y, Z = np.meshgrid(self.xs[a:b], self.ys[j0:j1],
+                                          self.zs[k0:k1], indexing="ij")
+                    pts_candidate = np.column_stack((X.ravel(), Y.ravel(), Z.ravel()))
+                    if method == "contains":
+                        inside_local = mesh.contains(pts_candidate)  # [web:82][web:114]
+                    else:
+                        inside_local = tree.winding_number(pts_candidate) > 0.5
+                    block = grid[a:b, j0:j1, k0:k1]
+                    block[inside_local.reshape(block.shape)] = label
+                    n_inside += inside_local.sum()
+            
+            if n_coarse == 0:
+                print("  No points in bounding box; skipping.")
+            elif method == "contains":
+                print(f"  Heterogeneity: coarse {n_coarse}, inside {n_inside}")
+            elif method == "winding":
+                print(f"  Winding number: coarse {n_coarse}, inside {n_inside}")
             else:
-                self.labels_1d[candidate_idx] = label
-                print(f"  Bulk region: labeled {candidate_idx.size} cells (AABB)")
+                print(f"  Bulk region: labeled {n_coarse} cells (AABB)")
         
         self.label_grid = self.labels_1d.reshape((self.nx, self.ny, self.nz))
+        self._lod = {}
         print("label_grid shape:", self.label_grid.shape)
         return self.label_grid
     
+    def rasterize_primitives(self, primitives, within=None):
+        """
+        Stamp analytic primitives (ellipsoids, boxes, cylinders) into
+        label_grid after label_domain, without meshes or containment tests.
+        
+        Later primitives overwrite earlier ones and everything already in
+        the grid; *within* restricts writes to cells holding those labels.
+        See primitives.sample_population for seeded populations.
+        
+        Returns
+        -------
+        label_grid : np.ndarray, shape (nx, ny, nz)
+        """
+        from primitives import rasterize_primitives
+        if self.label_grid is None:
+            raise ValueError("Run label_domain() before rasterizing primitives.")
+        rasterize_primitives(self.label_grid, self.axes, primitives, within=within)
+        self._lod = {}
+        return self.label_grid
+    
+    def estimate(self, verbose=True):
+        """
+        Dry-run prediction of peak memory and runtime for label_domain.
+        
+        Only the scene bounds and grid axes are used; no points are built.
+        
+        Returns
+        -------
+        estimate : dict
+            Keys 'cells', 'slab', 'peak_bytes', 'seconds' and 'objects'
+            (per-object candidate counts and time).
+        """
+        cells = self.nx * self.ny * self.nz
+        step = self._slab_step()
+        slab_cells = step * self.ny * self.nz
+        peak = 4 * cells + (_POINT_BYTES + _MASK_BYTES) * slab_cells
+        
+        objects = {}
+        for name, mesh in self.geoms.items():
+            tag = self._match_tag(name)
+            if tag is None:
+                continue
+            n_candidate = 1
+            for start, stop in self._index_ranges(*mesh.bounds):
+                n_candidate *= max(stop - start, 0)
+            method = self._get_method_for_name(name)
+            if method == "surface":
+                # Roughly three candidate cells per cell of surface area
+                cell = np.sort([np.diff(e).min() for e in self.edges])
+                n_candidate = 3 * mesh.area / cell[:2].prod()
+                seconds = n_candidate / _SAT_TESTS_PER_S
+            elif method == "heightfield":
+                # One ray per column, then a vectorized column fill
+                u, v = (a for a in range(3) if a != self.vertical_axis)
+                n_candidate = len(self.axes[u]) * len(self.axes[v])
+                seconds = n_candidate / _SAT_TESTS_PER_S + cells / _AABB_POINTS_PER_S
+            else:
+                rate = {"contains": _CONTAINS_POINTS_PER_S,
+                        "winding": _WINDING_POINTS_PER_S}.get(method, _AABB_POINTS_PER_S)
+                seconds = n_candidate / rate
+            objects[name] = {
+                "candidates": int(n_candidate),
+                "seconds": seconds,
+            }
+        
+        seconds = sum(o["seconds"] for o in objects.values())
+        if verbose:
+            chunk = "" if step >= self.nx else f", x-slabs of {step}"
+            print(f"Grid {self.nx} x {self.ny} x {self.nz} = {cells:,} cells{chunk}")
+            for name, o in objects.items():
+                print(f"  '{name}': {o['candidates']:,} candidates, ~{o['seconds']:.1f} s")
+            print(f"  peak ~{peak / 1e9:.2f} GB, ~{seconds:.0f} s total")
+        return {
+            "cells": cells,
+            "slab": step,
+            "peak_bytes": int(peak),
+            "seconds": seconds,
+            "objects": objects,
+        }
+    
+    def save(self, path):
+        """
+        Write label_grid and the grid axes to an uncompressed .npz file.
+        
+        The archive holds 'labels' (nx, ny, nz) int32, 'xs', 'ys', 'zs' and,
+        if material_fractions has run, 'fraction_index', 'fraction_labels'
+        and 'fractions'.
+        """
+        if self.label_grid is None:
+            raise ValueError("Run label_domain() before saving.")
+        arrays = {"labels": self.label_grid,
+                  "xs": self.xs, "ys": self.ys, "zs": self.zs}
+        if self.fractions is not None:
+            arrays["fraction_index"] = self.fractions["index"]
+            arrays["fraction_labels"] = self.fractions["labels"]
+            arrays["fractions"] = self.fractions["fractions"]
+        np.savez(path, **arrays)
+        print(f"Wrote {path}")
+    
+    # -------------------------
+    # sub-voxel material fractions
+    # -------------------------
+    
+    def _point_classifiers(self):
+        """
+        (label, inside) pairs in priority order, as used by label_domain.
+        
+        inside(points, cells) tests supersample points given the flat index
+        of the cell each one lies in.  Grid-aligned and surface objects are
+        resolved per cell: a voxel mesh contains whole cells, and a shell
+        claims every cell it touches.
+        """
+        classifiers = []
+        for name in sorted(self.geoms.keys(), key=self._get_priority_for_name):
+            mesh = self.geoms[name]
+            if self._match_tag(name) is None:
+                continue
+            label = self._get_label_for_name(name)
+            method = self._get_method_for_name(name)
+            
+            use_lattice = self.lattice_fill and method not in ("surface", "heightfield")
+            lattice = self._lattice_coords(mesh) if use_lattice else None
+            if lattice is not None and self._lattice_closed(lattice, mesh.faces):
+                def inside(points, cells, lattice=lattice, faces=mesh.faces):
+                    return self._lattice_inside(lattice, faces, cells)
+            elif method == "surface":
+                touched = np.unique(np.concatenate(
+                    [np.empty(0, dtype=np.int64)] + list(self._surface_cells(mesh))
+                ))
+                def inside(points, cells, touched=touched):
+                    return np.isin(cells, touched)
+            elif method == "heightfield":
+                axis = self.vertical_axis
+                bottom, top = self._column_span(mesh, axis)
+                def inside(points, cells, axis=axis, bottom=bottom, top=top):
+                    ijk = np.unravel_index(cells, (self.nx, self.ny, self.nz))
+                    col = tuple(ijk[a] for a in range(3) if a != axis)
+                    h = points[:, axis]
+                    return (h >= bottom[col]) & (h <= top[col])
+            elif method == "contains":
+                inside = (lambda points, cells, mesh=mesh: mesh.contains(points))
+            elif method == "winding":
+                tree = _WindingTree(mesh.triangles)
+                inside = (lambda points, cells, tree=tree:
+                          tree.winding_number(points) > 0.5)
+            else:
+                lo, hi = mesh.bounds
+                inside = (lambda points, cells, lo=lo, hi=hi:
+                          ((points >= lo) & (points <= hi)).all(axis=1))
+            classifiers.append((label, inside))
+        return classifiers
+    
+    def boundary_cells(self):
+        """
+        Flat indices of cells whose label differs from a face neighbour.
+        """
+        if self.label_grid is None:
+            raise ValueError("Run label_domain() before computing fractions.")
+        g = self.label_grid
+        mask = np.zeros(g.shape, dtype=bool)
+        for axis in range(3):
+            lo = [slice(None)] * 3
+            hi = [slice(None)] * 3
+            lo[axis], hi[axis] = slice(None, -1), slice(1, None)
+            diff = g[tuple(lo)] != g[tuple(hi)]
+            mask[tuple(lo)] |= diff
+            mask[tuple(hi)] |= diff
+        return np.flatnonzero(mask)
+    
+    def _fraction_batch(self):
+        """Supersample points per material_fractions batch."""
+        mesh_test = any(
+            self._get_method_for_name(name) in ("contains", "winding")
+            for name in self.geoms if self._match_tag(name) is not None
+        )
+        budget = self._budget()
+        if budget is None:
+            return _FRACTION_BATCH_MESH if mesh_test else _FRACTION_BATCH
+        per_point = _FRACTION_MESH_POINT_BYTES if mesh_test else _FRACTION_POINT_BYTES
+        return max(1, budget // per_point)
+    
+    def material_fractions(self, k=4):
+        """
+        Per-material volume fractions of boundary cells by k^3 supersampling.
+        
+        Only cells next to a label change in label_grid are resampled;
+        every other cell is fully its label_grid value.  Features thin
+        enough to fall between grid points in the centre pass are not
+        recovered.
+        
+        Parameters
+        ----------
+        k : int
+            Supersamples per axis and cell.  Cells are processed in
+            batches sized by memory_budget (small fixed batches without
+            one).
+        
+        Returns
+        -------
+        fractions : dict
+            Sparse table with 'index' (M,) flat cell indices into
+            label_grid, 'labels' (L,) material labels and 'fractions'
+            (M, L) float32 volume fractions (rows sum to 1).  Also stored as
+            self.fractions.
+        """
+        cells = self.boundary_cells()
+        classifiers = self._point_classifiers()
+        labels = np.unique(np.concatenate(
+            [[self.background_label], [lab for lab, _ in classifiers]]
+        )).astype(np.int32)
+        table = np.zeros((cells.size, labels.size), dtype=np.float32)
+        
+        # Sub-cell offsets in units of the cell size, centred on 0
+        sub = (np.arange(k) + 0.5) / k - 0.5
+        offsets = np.stack(np.meshgrid(sub, sub, sub, indexing="ij"), axis=-1).reshape(-1, 3)
+        n_sub = len(offsets)
+        batch = max(1, self._fraction_batch() // n_sub)
+        
+        for c0 in range(0, cells.size, batch):
+            flat = cells[c0:c0 + batch]
+            ijk = np.unravel_index(flat, (self.nx, self.ny, self.nz))
+            centre = np.empty((flat.size, 3))
+            size = np.empty((flat.size, 3))
+            for a in range(3):
+                e = self.edges[a]
+                centre[:, a] = 0.5 * (e[ijk[a]] + e[ijk[a] + 1])
+                size[:, a] = e[ijk[a] + 1] - e[ijk[a]]
+            points = (centre[:, None, :] + offsets[None] * size[:, None, :]).reshape(-1, 3)
+            owner = np.repeat(flat, n_sub)
+            
+            point_labels = np.full(len(points), self.background_label, dtype=np.int32)
+            for label, inside in classifiers:
+                point_labels[inside(points, owner)] = label
+            
+            column = np.searchsorted(labels, point_labels)
+            row = np.repeat(np.arange(flat.size), n_sub)
+            counts = np.bincount(row * labels.size + column,
+                                 minlength=flat.size * labels.size)
+            table[c0:c0 + flat.size] = counts.reshape(flat.size, labels.size) / n_sub
+        
+        self.fractions = {"index": cells, "labels": labels, "fractions": table}
+        mixed = int((table.max(axis=1) < 1).sum())
+        print(f"Fractions: {cells.size} boundary cells, {mixed} mixed, k={k}")
+        return self.fractions
+    
     def _get_priority_key(self, name: str) -> int:
         """
         Return priority for sorting based on the name and self.priority.
@@ -181,30 +1312,74 @@ class VolumeBuilder:
         return -1  # lowest priority
     
     # -------------------------
-    # visualization helper
+    # visualization helpers
     # -------------------------
     
-    def show_slice(self, index, plane="xy"):
+    def lod_grid(self, level=0):
+        """
+        Majority-vote preview of label_grid downsampled by 2**level.
+        
+        Each level is built from the previous one on first use and cached
+        until label_domain runs again (see surface_roughness.label_pyramid).
+        Levels above 0 need the sibling surface_roughness package
+        (python/surface-roughness/src), which is added to sys.path on use.
+        """
+        if self.label_grid is None:
+            raise ValueError("Run label_domain() before requesting a preview.")
+        if level < 0:
+            raise ValueError("level must be >= 0.")
+        if level == 0:
+            return self.label_grid
+        if level not in self._lod:
+            downsample_labels = _surface_roughness().downsample_labels
+            self._lod[level] = downsample_labels(
+                self.lod_grid(level - 1), 2, memory_budget=self.memory_budget
+            )
+        return self._lod[level]
+    
+    def viewer(self, **kwargs):
+        """
+        SliceViewer over label_grid sharing this builder's LOD cache.
+        
+        Planes are cached in a bounded LRU and zoomed-out views come from
+        the pyramid; see surface_roughness.SliceViewer for the keyword
+        arguments and render_slices for batch PNG output.  Needs the
+        sibling surface_roughness package (python/surface-roughness/src),
+        which is added to sys.path on use.
+        """
+        SliceViewer = _surface_roughness().SliceViewer
+        if self.label_grid is None:
+            raise ValueError("Run label_domain() before opening a viewer.")
+        return SliceViewer(self.label_grid, levels=self._lod,
+                           memory_budget=self.memory_budget, **kwargs)
+    
+    def show_slice(self, index, plane="xy", lod=0):
         """
         Show a 2D slice of a 3D array along one of the principal planes.
         plane: 'xy', 'xz', or 'yz'
+        index is in full-resolution cells; with lod > 0 the slice is taken
+        from the 2**lod downsampled preview (see lod_grid; needs the
+        sibling surface_roughness package).
         """
-        Nx, Ny, Nz = self.label_grid.shape
+        grid = self.lod_grid(lod)
+        index = index // 2**lod
+        Nx, Ny, Nz = grid.shape
+        suffix = f", lod={lod}" if lod else ""
         if plane == "xy":
             assert 0 <= index < Nz
-            img = self.label_grid[:, :, index]
+            img = grid[:, :, index]
             xlabel, ylabel = "ix", "iy"
-            title = f"Slice plane=xy, iz={index}"
+            title = f"Slice plane=xy, iz={index}{suffix}"
         elif plane == "xz":
             assert 0 <= index < Ny
-            img = self.label_grid[:, index, :]
+            img = grid[:, index, :]
             xlabel, ylabel = "ix", "iz"
-            title = f"Slice plane=xz, iy={index}"
+            title = f"Slice plane=xz, iy={index}{suffix}"
         elif plane == "yz":
             assert 0 <= index < Nx
-            img = self.label_grid[index, :, :]
+            img = grid[index, :, :]
             xlabel, ylabel = "iy", "iz"
-            title = f"Slice plane=yz, ix={index}"
+            title = f"Slice plane=yz, ix={index}{suffix}"
         else:
             raise ValueError("plane must be one of 'xy', 'xz', 'yz'")
         
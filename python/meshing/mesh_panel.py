@@ -1,5 +1,9 @@
 import bpy
 import os
+import hashlib
+import threading
+import numpy as np
+from bpy_extras.io_utils import ImportHelper
 
 # --- 1. SETUP CUSTOM PROPERTIES ---
 # This adds seismic parameters to every object in your scene
@@ -8,6 +12,8 @@ def init_properties():
     bpy.types.Object.density = bpy.props.FloatProperty(name="Density (kg/m3)", default=2500.0)
     bpy.types.Object.permeability = bpy.props.FloatProperty(name="Permeability (m2)", default=1e-12)
     bpy.types.Object.is_seismic_domain = bpy.props.BoolProperty(name="Include in Simulation", default=True)
+    bpy.types.Object.seismic_priority = bpy.props.IntProperty(name="Preview Priority", default=0)
+    bpy.types.Scene.seismic_preview_size = bpy.props.FloatProperty(name="Preview Cell Size (m)", default=1.0, min=1e-3)
 
 # --- 2. OPERATORS (The Buttons) ---
 
@@ -58,7 +64,385 @@ class SEISMIC_OT_ExportAll(bpy.types.Operator):
         self.report({'INFO'}, f"Exported to {target_dir}")
         return {'FINISHED'}
 
-# --- 3. THE UI PANEL ---
+class SEISMIC_OT_ExportScene(bpy.types.Operator):
+    """Export every simulation object to one binary .npz for VolumeBuilder"""
+    bl_idname = "seismic.export_scene"
+    bl_label = "Export Binary Scene"
+
+    def execute(self, context):
+        target_dir = bpy.path.abspath("//") # Saves next to your .blend file
+        npz_path = os.path.join(target_dir, "simulation_domain.npz")
+        depsgraph = context.evaluated_depsgraph_get()
+
+        names, matrices, params = [], [], []
+        vertices, triangles = [], []
+        vertex_offsets, triangle_offsets = [0], [0]
+        for obj in context.scene.objects:
+            if obj.type != 'MESH' or not obj.is_seismic_domain:
+                continue
+            # Evaluated mesh: modifiers applied, object transform not
+            obj_eval = obj.evaluated_get(depsgraph)
+            mesh = obj_eval.to_mesh()
+            mesh.calc_loop_triangles()
+
+            co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get("co", co)
+            tri = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get("vertices", tri)
+            obj_eval.to_mesh_clear()
+
+            names.append(obj.name)
+            matrices.append(np.array(obj.matrix_world, dtype=np.float64))
+            params.append((obj.density, obj.porosity, obj.permeability))
+            vertices.append(co.reshape(-1, 3))
+            triangles.append(tri.reshape(-1, 3))
+            vertex_offsets.append(vertex_offsets[-1] + len(co) // 3)
+            triangle_offsets.append(triangle_offsets[-1] + len(tri) // 3)
+
+        if not names:
+            self.report({'WARNING'}, "No objects marked 'Include in Simulation'")
+            return {'CANCELLED'}
+
+        # Uncompressed so the loader can memory-map every array
+        params = np.array(params, dtype=np.float64)
+        np.savez(
+            npz_path,
+            names=np.array(names),
+            vertices=np.concatenate(vertices),
+            triangles=np.concatenate(triangles),
+            vertex_offsets=np.array(vertex_offsets, dtype=np.int64),
+            triangle_offsets=np.array(triangle_offsets, dtype=np.int64),
+            matrices=np.stack(matrices),
+            density=params[:, 0],
+            porosity=params[:, 1],
+            permeability=params[:, 2],
+        )
+
+        self.report({'INFO'}, f"Exported {len(names)} objects to {npz_path}")
+        return {'FINISHED'}
+
+class SEISMIC_OT_ImportVoxelMesh(bpy.types.Operator, ImportHelper):
+    """Import a surface_roughness geometry_to_npz mesh with bulk array copies"""
+    bl_idname = "seismic.import_voxel_mesh"
+    bl_label = "Import Voxel Mesh (.npz)"
+
+    filename_ext = ".npz"
+    filter_glob: bpy.props.StringProperty(default="*.npz", options={'HIDDEN'})
+
+    def execute(self, context):
+        data = np.load(self.filepath)
+        verts = data["vertices"]
+        quads = data["faces"]
+        offsets = data["face_offsets"]
+        n_faces = len(quads)
+        name = os.path.splitext(os.path.basename(self.filepath))[0]
+
+        # Every face is a quad: loops are the flattened face array
+        mesh = bpy.data.meshes.new(name)
+        mesh.vertices.add(len(verts))
+        mesh.vertices.foreach_set("co", verts.ravel())
+        mesh.loops.add(4 * n_faces)
+        mesh.loops.foreach_set("vertex_index", quads.ravel())
+        mesh.polygons.add(n_faces)
+        mesh.polygons.foreach_set("loop_start", np.arange(0, 4 * n_faces, 4, dtype=np.int32))
+        if not mesh.polygons.bl_rna.properties["loop_total"].is_readonly:
+            mesh.polygons.foreach_set("loop_total", np.full(n_faces, 4, dtype=np.int32))
+
+        # One material slot per label, faces are grouped by label
+        for mat_name, colour in zip(data["material_names"], data["material_colours"]):
+            mat = bpy.data.materials.get(str(mat_name)) or bpy.data.materials.new(str(mat_name))
+            mat.diffuse_color = (*colour, 1.0)
+            mesh.materials.append(mat)
+        slots = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+        mesh.polygons.foreach_set("material_index", slots)
+
+        mesh.update()
+        obj = bpy.data.objects.new(name, mesh)
+        context.collection.objects.link(obj)
+
+        self.report({'INFO'}, f"Imported {len(verts)} vertices, {n_faces} faces")
+        return {'FINISHED'}
+
+# --- 3. VOXEL PREVIEW ---
+# The helpers below use NumPy only so they can run on a worker thread;
+# everything that touches bpy stays in the modal operator.
+
+# Object name -> (state key, inside mask over the object's own index window);
+# reused while an object is unchanged
+_PREVIEW_CACHE = {}
+# Triangle-column pairs tested per batch by _inside_mask
+_PREVIEW_BATCH = 2**20
+
+
+def _world_triangles(obj, depsgraph):
+    """World-space triangles (F, 3, 3) of the evaluated object, via foreach_get."""
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    mesh.calc_loop_triangles()
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    tri = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("vertices", tri)
+    obj_eval.to_mesh_clear()
+    matrix = np.array(obj.matrix_world, dtype=np.float64)
+    co = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    return co[tri.reshape(-1, 3)]
+
+
+def _inside_mask(tris, xs, ys, zs, cancel):
+    """
+    Cells (nx, ny, nz) inside a closed mesh, by z-ray parity per column.
+
+    Each triangle is intersected with the columns whose (x, y) lie in its
+    projection; every crossing flips inside/outside for the grid points
+    above it.  Returns None if *cancel* is set part-way.
+    """
+    nx, ny, nz = len(xs), len(ys), len(zs)
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+    det = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1])
+    keep = det != 0   # triangles seen edge-on from z cannot be crossed
+    a, b, c, det = a[keep], b[keep], c[keep], det[keep]
+
+    # Rays are nudged off the grid lines so none runs exactly along a
+    # mesh edge shared by two triangles (which would count twice)
+    rx = xs + 1e-7 * np.sqrt(2.0) * np.ptp(xs)
+    ry = ys + 1e-7 * np.sqrt(3.0) * np.ptp(ys)
+    lo = np.minimum(np.minimum(a, b), c)
+    hi = np.maximum(np.maximum(a, b), c)
+    i0, i1 = np.searchsorted(rx, lo[:, 0]), np.searchsorted(rx, hi[:, 0], side="right")
+    j0, j1 = np.searchsorted(ry, lo[:, 1]), np.searchsorted(ry, hi[:, 1], side="right")
+    ni, nj = np.clip(i1 - i0, 0, None), np.clip(j1 - j0, 0, None)
+    cost = ni * nj
+    bounds = np.searchsorted(np.cumsum(cost), np.arange(0, cost.sum(), _PREVIEW_BATCH))
+
+    flips = np.zeros(nx * ny * (nz + 1), dtype=np.uint8)
+    for t0, t1 in zip(bounds, np.append(bounds[1:], len(cost))):
+        if cancel.is_set():
+            return None
+        n = cost[t0:t1]
+        t = t0 + np.repeat(np.arange(t1 - t0), n)
+        local = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        ci = i0[t] + local // nj[t]
+        cj = j0[t] + local % nj[t]
+        # Barycentric coordinates of the column in the projected triangle
+        dx, dy = rx[ci] - a[t, 0], ry[cj] - a[t, 1]
+        e1, e2 = b[t] - a[t], c[t] - a[t]
+        u = (dx * e2[:, 1] - e2[:, 0] * dy) / det[t]
+        v = (e1[:, 0] * dy - dx * e1[:, 1]) / det[t]
+        hit = (u >= 0) & (v >= 0) & (u + v <= 1)
+        z = a[t, 2] + u * e1[:, 2] + v * e2[:, 2]
+        ci, cj, z = ci[hit], cj[hit], z[hit]
+        k = np.searchsorted(zs, z)
+        np.bitwise_xor.at(flips, (ci * ny + cj) * (nz + 1) + k, 1)
+
+    inside = np.bitwise_xor.accumulate(flips.reshape(nx, ny, nz + 1), axis=2)
+    return inside[:, :, :nz].astype(bool)
+
+
+def _exposed_faces(labels, xs, ys, zs, background=0, cancel=None):
+    """
+    Quads on the faces where a non-background cell meets a different label.
+
+    A face between two materials is emitted once, from the lower label's
+    side, so the viewport has no coincident opposite quads.  Returns
+    (vertices (4F, 3) float32, per-face label (F,)); vertex 4f..4f+3 belong
+    to face f.  Returns None if *cancel* is set part-way.
+    """
+    edges = []
+    for axis in (xs, ys, zs):
+        d = np.diff(axis).min() if len(axis) > 1 else 1.0
+        edges.append(np.concatenate(([axis[0] - 0.5 * d],
+                                     0.5 * (axis[1:] + axis[:-1]),
+                                     [axis[-1] + 0.5 * d])))
+    padded = np.pad(labels, 1, constant_values=background)
+    corners, face_labels = [], []
+    for w in range(3):
+        u, v = (w + 1) % 3, (w + 2) % 3
+        for side in (-1, 1):
+            if cancel is not None and cancel.is_set():
+                return None
+            inner = padded[1:-1, 1:-1, 1:-1]
+            outer = np.roll(padded, -side, axis=w)[1:-1, 1:-1, 1:-1]
+            exposed = (outer == background) | (inner < outer)
+            idx = np.nonzero(exposed & (inner != background))
+            if idx[0].size == 0:
+                continue
+            face = np.empty((idx[0].size, 4, 3))
+            plane = edges[w][idx[w] + (side > 0)]
+            for n, (du, dv) in enumerate(((0, 0), (1, 0), (1, 1), (0, 1))):
+                face[:, n, w] = plane
+                face[:, n, u] = edges[u][idx[u] + du]
+                face[:, n, v] = edges[v][idx[v] + dv]
+            if side < 0:
+                face = face[:, ::-1]
+            corners.append(face)
+            face_labels.append(inner[idx])
+    if not corners:
+        return np.empty((0, 3), dtype=np.float32), np.empty(0, dtype=labels.dtype)
+    return np.concatenate(corners).reshape(-1, 3).astype(np.float32), np.concatenate(face_labels)
+
+
+def _preview_worker(jobs, size, origin, shape, state):
+    """
+    Label grid from (name, key, label, triangles, window) jobs in priority order.
+
+    Grid point n on each axis lies at ``size * n``; the scene grid starts at
+    index *origin* and each object is voxelized over its own [start, stop)
+    index *window*, so its mask does not depend on the other objects.
+    Reuses cached masks for unchanged objects; progress, cancellation and
+    the result go through the shared *state* dict.
+    """
+    labels = np.zeros(shape, dtype=np.int32)
+    for n, (name, key, label, tris, window) in enumerate(jobs):
+        cached = _PREVIEW_CACHE.get(name)
+        if cached is not None and cached[0] == key:
+            mask = cached[1]
+        else:
+            axes = [size * np.arange(start, stop) for start, stop in window]
+            mask = _inside_mask(tris, *axes, state["cancel"])
+            if mask is None:
+                return
+            _PREVIEW_CACHE[name] = (key, mask)
+            state["computed"] += 1
+        block = tuple(slice(start - o, stop - o) for (start, stop), o in zip(window, origin))
+        labels[block][mask] = label
+        state["done"] = n + 1
+    xs, ys, zs = (size * np.arange(o, o + m) for o, m in zip(origin, shape))
+    faces = _exposed_faces(labels, xs, ys, zs, cancel=state["cancel"])
+    if faces is None:
+        return
+    state["faces"] = faces
+    state["labels"] = labels
+
+
+class SEISMIC_OT_VoxelPreview(bpy.types.Operator):
+    """Voxelize the simulation objects at preview resolution in the background (Esc cancels)"""
+    bl_idname = "seismic.voxel_preview"
+    bl_label = "Voxel Preview"
+
+    _timer = None
+    _thread = None
+    _state = None
+
+    def invoke(self, context, event):
+        depsgraph = context.evaluated_depsgraph_get()
+        objs = sorted(
+            (o for o in context.scene.objects
+             if o.type == 'MESH' and o.is_seismic_domain and o.name != "VOXEL_PREVIEW"),
+            key=lambda o: o.seismic_priority,
+        )
+        tris = [_world_triangles(o, depsgraph) for o in objs]
+        tris = [(o, t) for o, t in zip(objs, tris) if len(t)]
+        if not tris:
+            self.report({'WARNING'}, "No objects marked 'Include in Simulation'")
+            return {'CANCELLED'}
+
+        # Grid points sit on multiples of size, so an object's index window
+        # follows its own extent and not that of the whole scene
+        size = context.scene.seismic_preview_size
+        windows = []
+        for _, t in tris:
+            pts = t.reshape(-1, 3)
+            start = np.floor(pts.min(axis=0) / size).astype(np.int64)
+            stop = np.floor(pts.max(axis=0) / size).astype(np.int64) + 1
+            windows.append(tuple(zip(start.tolist(), stop.tolist())))
+        origin = np.min([[w[0] for w in win] for win in windows], axis=0)
+        shape = np.max([[w[1] for w in win] for win in windows], axis=0) - origin
+
+        # An object is recomputed only when its world triangles, its window
+        # or the cell size change
+        jobs, self._materials = [], []
+        for n, ((o, t), window) in enumerate(zip(tris, windows)):
+            grid = np.array([size, *np.ravel(window)], dtype=np.float64).tobytes()
+            key = hashlib.blake2b(t.tobytes() + grid, digest_size=16).hexdigest()
+            jobs.append((o.name, key, n + 1, t, window))
+            mat = o.material_slots[0].material if o.material_slots else None
+            self._materials.append(
+                (o.name, tuple(mat.diffuse_color) if mat else (1.0, 1.0, 1.0, 1.0))
+            )
+        self._shape = tuple(int(m) for m in shape)
+
+        self._state = {"cancel": threading.Event(), "done": 0, "computed": 0,
+                       "total": len(jobs)}
+        self._thread = threading.Thread(
+            target=_preview_worker,
+            args=(jobs, size, tuple(int(o) for o in origin), self._shape, self._state),
+            daemon=True,
+        )
+        self._thread.start()
+
+        wm = context.window_manager
+        wm.progress_begin(0, len(jobs))
+        self._timer = wm.event_timer_add(0.1, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        state = self._state
+        if event.type == 'ESC':
+            state["cancel"].set()
+            self._thread.join()
+            self._finish(context)
+            self.report({'INFO'}, "Voxel preview cancelled")
+            return {'CANCELLED'}
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        context.window_manager.progress_update(state["done"])
+        context.workspace.status_text_set(
+            f"Voxel preview: {state['done']}/{state['total']} objects (Esc to cancel)"
+        )
+        if self._thread.is_alive():
+            return {'PASS_THROUGH'}
+
+        self._finish(context)
+        if "faces" not in state:
+            self.report({'ERROR'}, "Voxel preview failed; see the console")
+            return {'CANCELLED'}
+        self._build_mesh(context, *state["faces"])
+        nx, ny, nz = self._shape
+        self.report({'INFO'}, f"Voxel preview {nx} x {ny} x {nz}: "
+                              f"{state['computed']}/{state['total']} objects recomputed")
+        return {'FINISHED'}
+
+    def _finish(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+
+    def _build_mesh(self, context, verts, face_labels):
+        old = bpy.data.objects.get("VOXEL_PREVIEW")
+        if old is not None:
+            old_mesh = old.data
+            bpy.data.objects.remove(old, do_unlink=True)
+            bpy.data.meshes.remove(old_mesh)
+
+        n_faces = len(face_labels)
+        mesh = bpy.data.meshes.new("VOXEL_PREVIEW")
+        mesh.vertices.add(len(verts))
+        mesh.vertices.foreach_set("co", verts.ravel())
+        mesh.loops.add(4 * n_faces)
+        mesh.loops.foreach_set("vertex_index", np.arange(4 * n_faces, dtype=np.int32))
+        mesh.polygons.add(n_faces)
+        mesh.polygons.foreach_set("loop_start", np.arange(0, 4 * n_faces, 4, dtype=np.int32))
+        if not mesh.polygons.bl_rna.properties["loop_total"].is_readonly:
+            mesh.polygons.foreach_set("loop_total", np.full(n_faces, 4, dtype=np.int32))
+
+        # Label n is the n-th object in priority order -> material slot n - 1
+        for name, colour in self._materials:
+            mat_name = f"preview_{name}"
+            mat = bpy.data.materials.get(mat_name) or bpy.data.materials.new(mat_name)
+            mat.diffuse_color = colour
+            mesh.materials.append(mat)
+        mesh.polygons.foreach_set("material_index", (face_labels - 1).astype(np.int32))
+        mesh.update()
+
+        obj = bpy.data.objects.new("VOXEL_PREVIEW", mesh)
+        obj.is_seismic_domain = False
+        context.collection.objects.link(obj)
+
+# --- 4. THE UI PANEL ---
 
 class SEISMIC_PT_Panel(bpy.types.Panel):
     bl_label = "SeidarT Domain Tools"
@@ -78,12 +462,18 @@ class SEISMIC_PT_Panel(bpy.types.Panel):
             col.prop(obj, "density")
             col.prop(obj, "porosity")
             col.prop(obj, "permeability")
+            col.prop(obj, "seismic_priority")
             
             layout.separator()
             layout.operator("seismic.generate_mesh", icon='MESH_DATA')
             layout.operator("seismic.remove_mesh", icon='TRASH')
             layout.separator()
             layout.operator("seismic.export_all", icon='EXPORT')
+            layout.operator("seismic.export_scene", icon='EXPORT')
+            layout.operator("seismic.import_voxel_mesh", icon='IMPORT')
+            layout.separator()
+            layout.prop(context.scene, "seismic_preview_size")
+            layout.operator("seismic.voxel_preview", icon='MESH_GRID')
 
 # --- REGISTRATION ---
 
@@ -92,12 +482,18 @@ def register():
     bpy.utils.register_class(SEISMIC_OT_GenerateMesh)
     bpy.utils.register_class(SEISMIC_OT_RemoveMesh)
     bpy.utils.register_class(SEISMIC_OT_ExportAll)
+    bpy.utils.register_class(SEISMIC_OT_ExportScene)
+    bpy.utils.register_class(SEISMIC_OT_ImportVoxelMesh)
+    bpy.utils.register_class(SEISMIC_OT_VoxelPreview)
     bpy.utils.register_class(SEISMIC_PT_Panel)
 
 def unregister():
     bpy.utils.unregister_class(SEISMIC_OT_GenerateMesh)
     bpy.utils.unregister_class(SEISMIC_OT_RemoveMesh)
     bpy.utils.unregister_class(SEISMIC_OT_ExportAll)
+    bpy.utils.unregister_class(SEISMIC_OT_ExportScene)
+    bpy.utils.unregister_class(SEISMIC_OT_ImportVoxelMesh)
+    bpy.utils.unregister_class(SEISMIC_OT_VoxelPreview)
     bpy.utils.unregister_class(SEISMIC_PT_Panel)
 
 if __name__ == "__main__":
@@ -0,0 +1,252 @@
+"""
+Analytic primitive rasterizer for stochastic inclusion populations.
+
+Thousands of ellipsoidal, box or cylindrical inclusions do not need to be
+modelled as meshes and tested with `mesh.contains`: each one is an
+implicit inside test in its own local frame.  `rasterize_primitives`
+evaluates that test only at the grid points inside each primitive's
+index-space bounding box, batched over primitives in NumPy, and writes
+labels in primitive order (later primitives win).  `sample_population`
+draws a seeded population from size and orientation distributions.
+
+Works on any label grid with its axes, e.g. a VolumeBuilder after
+label_domain (see `VolumeBuilder.rasterize_primitives`).
+"""
+
+import numpy as np
+
+# Primitive kinds; a sphere is an ellipsoid with equal semi-axes.
+KINDS = ("ellipsoid", "box", "cylinder")
+# Candidate grid points tested per batch; a primitive whose box holds more
+# is split over several batches.
+_PRIMITIVE_BATCH = 2**20
+
+
+class Primitives:
+    """
+    Arrays of analytic primitives.
+    
+    Parameters
+    ----------
+    kind : str or sequence of str
+        'ellipsoid', 'sphere', 'box' or 'cylinder' per primitive (or one
+        for all).
+    centre : array_like, shape (N, 3)
+    half : array_like, shape (N, 3) or (N,)
+        Semi-axes along the local x, y, z axes: ellipsoid radii, box half
+        extents, or (radius, radius, half-length) of a cylinder along its
+        local z.  A scalar per primitive gives a sphere/cube.
+    rotation : array_like, shape (N, 3, 3), optional
+        Local -> world rotation matrices; identity by default.
+    label : int or array_like of int, shape (N,)
+    """
+    
+    def __init__(self, kind, centre, half, rotation=None, label=1):
+        self.centre = np.atleast_2d(np.asarray(centre, dtype=float))
+        n = len(self.centre)
+        half = np.asarray(half, dtype=float)
+        if half.ndim < 2:
+            half = np.repeat(np.broadcast_to(half, (n,))[:, None], 3, axis=1)
+        self.half = np.broadcast_to(half, (n, 3)).copy()
+        if (self.half <= 0).any():
+            raise ValueError("Primitive semi-axes must be positive.")
+        
+        kinds = np.broadcast_to(np.asarray(kind), (n,))
+        kinds = np.where(kinds == "sphere", "ellipsoid", kinds)
+        unknown = set(kinds) - set(KINDS)
+        if unknown:
+            raise ValueError(f"Unknown primitive kind(s) {sorted(unknown)}; "
+                             f"expected one of {KINDS} or 'sphere'.")
+        self.kind = np.array([KINDS.index(k) for k in kinds], dtype=np.int8)
+        
+        if rotation is None:
+            rotation = np.eye(3)
+        self.rotation = np.broadcast_to(np.asarray(rotation, dtype=float), (n, 3, 3)).copy()
+        self.label = np.broadcast_to(np.asarray(label, dtype=np.int32), (n,)).copy()
+    
+    def __len__(self):
+        return len(self.centre)
+    
+    def __add__(self, other):
+        """Concatenate two sets; *other* is rasterized after self."""
+        out = Primitives.__new__(Primitives)
+        for key in ("centre", "half", "kind", "rotation", "label"):
+            setattr(out, key, np.concatenate([getattr(self, key), getattr(other, key)]))
+        return out
+    
+    def extent(self):
+        """World-space half extents (N, 3) of each primitive's bounding box."""
+        if len(self) == 0:
+            return np.zeros((0, 3))
+        R, h = self.rotation, self.half
+        # Boxes and cylinders: sum of |R| h; ellipsoids: exact sqrt(sum (R h)^2)
+        box = np.einsum("nij,nj->ni", np.abs(R), h)
+        ellipsoid = np.sqrt(np.einsum("nij,nj->ni", R**2, h**2))
+        cylinder = (np.sqrt(R[:, :, 0]**2 + R[:, :, 1]**2) * h[:, :1]
+                    + np.abs(R[:, :, 2]) * h[:, 2:])
+        return np.select(
+            [self.kind[:, None] == 0, self.kind[:, None] == 1], [ellipsoid, box], cylinder
+        )
+
+
+def _random_rotations(rng, n, orientation):
+    """(n, 3, 3) rotation matrices: 'fixed', 'vertical' (about z) or 'random'."""
+    if orientation == "fixed":
+        return np.broadcast_to(np.eye(3), (n, 3, 3)).copy()
+    if orientation == "vertical":
+        theta = rng.uniform(0.0, 2.0 * np.pi, n)
+        c, s = np.cos(theta), np.sin(theta)
+        R = np.zeros((n, 3, 3))
+        R[:, 0, 0], R[:, 0, 1], R[:, 1, 0], R[:, 1, 1] = c, -s, s, c
+        R[:, 2, 2] = 1.0
+        return R
+    if orientation == "random":
+        # Uniform on SO(3) from normalised Gaussian quaternions
+        q = rng.normal(size=(4, n))
+        w, x, y, z = q / np.linalg.norm(q, axis=0)
+        return np.stack([
+            np.stack([1 - 2 * (y*y + z*z), 2 * (x*y - w*z), 2 * (x*z + w*y)], -1),
+            np.stack([2 * (x*y + w*z), 1 - 2 * (x*x + z*z), 2 * (y*z - w*x)], -1),
+            np.stack([2 * (x*z - w*y), 2 * (y*z + w*x), 1 - 2 * (x*x + y*y)], -1),
+        ], axis=1)
+    raise ValueError("orientation must be 'fixed', 'vertical' or 'random'.")
+
+
+def sample_population(
+        n,
+        bounds,
+        half,
+        *,
+        kind="ellipsoid",
+        size_sigma=0.0,
+        aspect_sigma=0.0,
+        orientation="random",
+        label=1,
+        seed=42,
+    ):
+    """
+    Seeded random population of primitives.
+    
+    Parameters
+    ----------
+    n : int
+        Number of primitives.
+    bounds : array_like, shape (2, 3)
+        (min, max) corners of the box the centres are drawn from uniformly.
+    half : float or array_like, shape (3,)
+        Median semi-axes.
+    kind : str, optional
+        Primitive kind for all members (see Primitives).
+    size_sigma : float, optional
+        Log-normal spread of the overall size (one factor per primitive).
+    aspect_sigma : float, optional
+        Log-normal spread of each semi-axis on top of the size factor.
+    orientation : {'random', 'vertical', 'fixed'}, optional
+        Uniform random rotations, random rotations about z, or none.
+    label : int, optional
+    seed : int, optional
+        Random seed for reproducibility.
+    
+    Returns
+    -------
+    primitives : Primitives
+    """
+    rng = np.random.default_rng(seed)
+    lo, hi = np.asarray(bounds, dtype=float)
+    centre = rng.uniform(lo, hi, size=(n, 3))
+    half = np.broadcast_to(np.asarray(half, dtype=float), (3,))
+    scale = np.exp(size_sigma * rng.normal(size=(n, 1)))
+    aspect = np.exp(aspect_sigma * rng.normal(size=(n, 3)))
+    if kind in ("sphere", "cylinder"):
+        # Keep cross-sections round
+        aspect[:, 1] = aspect[:, 0]
+        if kind == "sphere":
+            aspect[:, 2] = aspect[:, 0]
+    rotation = _random_rotations(rng, n, orientation)
+    return Primitives(kind, centre, half * scale * aspect, rotation, label)
+
+
+def rasterize_primitives(labels, axes, primitives, within=None, verbose=True):
+    """
+    Write primitive labels into a label grid in place.
+    
+    Parameters
+    ----------
+    labels : ndarray, shape (nx, ny, nz)
+        Label grid (modified in place).
+    axes : tuple of 3 array_like
+        Strictly increasing grid point coordinates (xs, ys, zs); stretched
+        grids are fine.
+    primitives : Primitives
+    within : iterable of int, optional
+        Only cells holding one of these labels before the call are
+        overwritten, e.g. {ice_label} to keep inclusions inside the ice.
+    
+    Returns
+    -------
+    n_cells : int
+        Number of grid points written (repeats across overlaps counted).
+    """
+    axes = [np.asarray(a, dtype=float) for a in axes]
+    shape = tuple(len(a) for a in axes)
+    if labels.shape != shape:
+        raise ValueError(f"labels has shape {labels.shape}, axes give {shape}.")
+    allowed = None if within is None else np.array(sorted(within))
+    
+    ext = primitives.extent()
+    lo, hi = primitives.centre - ext, primitives.centre + ext
+    start = np.stack([np.searchsorted(a, lo[:, d], side="left")
+                      for d, a in enumerate(axes)], axis=1)
+    count = np.stack([np.searchsorted(a, hi[:, d], side="right")
+                      for d, a in enumerate(axes)], axis=1) - start
+    count = np.clip(count, 0, None)
+    cost = count.prod(axis=1)
+    ends = np.cumsum(cost)
+    
+    flat_labels = labels.reshape(-1)
+    # Overwritable cells as they were before this call, so the outcome of
+    # overlaps does not depend on which batch writes first
+    ok = None if allowed is None else np.isin(flat_labels, allowed)
+    n_cells = 0
+    # Batches are contiguous runs of the concatenated index boxes, in
+    # primitive order; a large box spans several batches
+    for g0 in range(0, int(ends[-1]) if len(ends) else 0, _PRIMITIVE_BATCH):
+        g = np.arange(g0, min(g0 + _PRIMITIVE_BATCH, int(ends[-1])))
+        owner = np.searchsorted(ends, g, side="right")
+        local = g - (ends[owner] - cost[owner])
+        cy, cz = count[owner, 1], count[owner, 2]
+        i = start[owner, 0] + local // (cy * cz)
+        j = start[owner, 1] + (local // cz) % cy
+        k = start[owner, 2] + local % cz
+        
+        # Implicit test in each primitive's unit local frame, one local
+        # axis at a time to keep the gathered rotations small
+        d = np.stack([axes[0][i], axes[1][j], axes[2][k]], axis=1) - primitives.centre[owner]
+        u = np.stack([(primitives.rotation[owner, :, c] * d).sum(axis=1)
+                      for c in range(3)], axis=1) / primitives.half[owner]
+        kind = primitives.kind[owner]
+        inside = np.where(
+            kind == 0, (u**2).sum(axis=1) <= 1.0,
+            np.where(kind == 1, np.abs(u).max(axis=1) <= 1.0,
+                     (u[:, 0]**2 + u[:, 1]**2 <= 1.0) & (np.abs(u[:, 2]) <= 1.0)),
+        )
+        flat = np.ravel_multi_index((i[inside], j[inside], k[inside]), shape)
+        owner = owner[inside]
+        if ok is not None:
+            keep = ok[flat]
+            flat, owner = flat[keep], owner[keep]
+        if flat.size == 0:
+            continue
+        
+        # Later primitives win: keep the last owner of each grid point
+        order = np.lexsort((owner, flat))
+        flat, owner = flat[order], owner[order]
+        last = np.append(flat[1:] != flat[:-1], True)
+        flat_labels[flat[last]] = primitives.label[owner[last]]
+        n_cells += int(last.sum())
+    
+    if not np.shares_memory(flat_labels, labels):
+        labels[...] = flat_labels.reshape(shape)
+    if verbose:
+        print(f"Primitives: {len(primitives)} rasterized, {n_cells} cells labeled")
+    return n_cells
@@ -12,7 +12,23 @@ from surface_roughness.classes.definitions import (
     write_geometry,
     build_seidart_surfaces,
 )
+from surface_roughness.classes.lazydomain import LazyDomain
+from surface_roughness.classes.memory import (
+    set_memory_budget,
+    get_memory_budget,
+    memory_budget,
+    estimate_pipeline,
+)
 from surface_roughness.classes.objexport import geometry_to_obj
+from surface_roughness.classes.meshexport import (
+    geometry_to_ply,
+    geometry_to_glb,
+    geometry_to_npz,
+)
+from surface_roughness.classes.isosurface import geometry_to_isosurface
+from surface_roughness.classes.lod import downsample_labels, label_pyramid
+from surface_roughness.classes.sliceview import SliceViewer, open_geometry, render_slices
+from surface_roughness.classes.properties import property_table, property_volumes
 
 __all__ = [
     "RoughSurface",
@@ -25,5 +41,21 @@ __all__ = [
     "insert_surface_rotated",
     "write_geometry",
     "build_seidart_surfaces",
+    "LazyDomain",
+    "set_memory_budget",
+    "get_memory_budget",
+    "memory_budget",
+    "estimate_pipeline",
     "geometry_to_obj",
+    "geometry_to_ply",
+    "geometry_to_glb",
+    "geometry_to_npz",
+    "geometry_to_isosurface",
+    "downsample_labels",
+    "label_pyramid",
+    "SliceViewer",
+    "open_geometry",
+    "render_slices",
+    "property_table",
+    "property_volumes",
 ]
@@ -1,4 +1,11 @@
 """Classes sub-package."""
 from .classes import RoughSurface
 from .definitions import *
+from .lazydomain import LazyDomain
+from .memory import set_memory_budget, get_memory_budget, memory_budget, estimate_pipeline
 from .objexport import geometry_to_obj
+from .meshexport import geometry_to_ply, geometry_to_glb, geometry_to_npz
+from .isosurface import geometry_to_isosurface
+from .lod import downsample_labels, label_pyramid
+from .sliceview import SliceViewer, open_geometry, render_slices
+from .properties import property_table, property_volumes
@@ -31,6 +31,9 @@ from scipy.spatial.transform import Rotation
 import gstools as gs
 from gstools.field.generator import Fourier
 
+from .lazydomain import LazyDomain
+from .memory import slab_size
+
 
 # =============================================================================
 # ============================== Surface Fields ===============================
@@ -214,7 +217,9 @@ def validate_resolution(
 def extrude_domain_3d(
         geometry_array: np.ndarray,
         ny: int,
-    ) -> np.ndarray:
+        *,
+        lazy: bool = False,
+    ):
     """Extrude a 2-D cross-section into a uniform 3-D domain.
 
     Parameters
@@ -223,15 +228,20 @@ def extrude_domain_3d(
         Integer material-ID array in the x–z plane.
     ny : int
         Number of grid points in the y-direction.
+    lazy : bool, optional
+        If ``True``, return a copy-on-write ``LazyDomain`` that references
+        the section instead of repeating it *ny* times in memory.
 
     Returns
     -------
-    labels : ndarray, shape (nx, ny, nz)
+    labels : ndarray or LazyDomain, shape (nx, ny, nz)
         3-D integer geometry array (SeidarT convention).
     """
     geometry_array = np.asarray(geometry_array)
     if geometry_array.ndim != 2:
         raise ValueError("Geometry must be a 2-D array of shape (nx, nz).")
+    if lazy:
+        return LazyDomain.extrude(geometry_array, ny)
 
     nx, nz = geometry_array.shape
     # Broadcast along the new y-axis (axis 1)
@@ -271,6 +281,7 @@ def voxelize_surface(
         vertical_shift: int = 0,
         mode: str = "below",
         clamp: bool = True,
+        memory_budget=None,
     ) -> np.ndarray:
     """Stamp a 2-D surface into a 3-D geometry array along the z-axis.
 
@@ -280,8 +291,9 @@ def voxelize_surface(
 
     Parameters
     ----------
-    geometry_3d : ndarray, shape (nx, ny, nz)
-        Mutable integer geometry array.
+    geometry_3d : ndarray or LazyDomain, shape (nx, ny, nz)
+        Mutable integer geometry array.  A ``LazyDomain`` is stamped
+        block-wise and only the blocks the layer touches are materialised.
     surface_model : ndarray, shape (nx, ny)
         Surface height expressed as **z-index** values.
     material_id : int
@@ -297,10 +309,13 @@ def voxelize_surface(
     clamp : bool, optional
         If ``True``, indices are clamped to ``[0, nz)``; otherwise an
         ``IndexError`` is raised when the layer exceeds the domain.
+    memory_budget : int or str, optional
+        Limit for the layer-mask temporaries (see ``set_memory_budget``).
+        The mask is built in x-slabs when the full mask would exceed it.
 
     Returns
     -------
-    out : ndarray, shape (nx, ny, nz)
+    out : ndarray or LazyDomain, shape (nx, ny, nz)
         Copy of *geometry_3d* with the surface layer written.
     """
     if geometry_3d.ndim != 3:
@@ -349,14 +364,20 @@ def voxelize_surface(
         if (k0 < 0).any() or (k1 > nz).any():
             raise IndexError("Surface layer extends outside z bounds.")
 
-    # Vectorised boolean mask
-    Z = np.arange(nz, dtype=np.int64)[None, None, :]        # (1, 1, nz)
-    start = k0[:, :, None]                                   # (nx, ny, 1)
-    stop = k1[:, :, None]                                    # (nx, ny, 1)
-    layer_mask = (Z >= start) & (Z < stop)                   # (nx, ny, nz)
+    if isinstance(geometry_3d, LazyDomain):
+        out = geometry_3d.copy()
+        out.fill_columns(k0, k1, int(material_id))
+        return out
 
+    # Vectorised boolean mask, one x-slab at a time if the budget requires
     out = np.array(geometry_3d, copy=True)
-    out[layer_mask] = int(material_id)
+    Z = np.arange(nz, dtype=np.int64)[None, None, :]        # (1, 1, nz)
+    step = slab_size(nx, 3 * ny * nz, memory_budget)         # 3 bool temps
+    for i0 in range(0, nx, step):
+        start = k0[i0:i0 + step, :, None]                    # (s, ny, 1)
+        stop = k1[i0:i0 + step, :, None]                     # (s, ny, 1)
+        layer_mask = (Z >= start) & (Z < stop)               # (s, ny, nz)
+        out[i0:i0 + step][layer_mask] = int(material_id)
     return out
 
 
@@ -382,14 +403,16 @@ def insert_surface_rotated(
     Euler angles and translated so that its origin aligns with
     *reference_point* in the domain.  The reference point ``(0, 0, 0)``
     corresponds to the domain origin **before** CPML padding is added
-    (i.e. grid-index ``(cpml, cpml, cpml)`` in the padded array).
+    (i.e. grid-index ``(cpml, cpml, cpml)`` in the padded array).  A padded
+    ``LazyDomain`` carries that offset in its ``origin``; plain arrays are
+    assumed to be unpadded.
 
     The surface can be larger or smaller than the domain—only the portion
     that overlaps the grid is stamped.
 
     Parameters
     ----------
-    geometry_3d : ndarray, shape (nx, ny, nz)
+    geometry_3d : ndarray or LazyDomain, shape (nx, ny, nz)
         Mutable integer geometry array.
     surface_model : ndarray, shape (ns_x, ns_y)
         Surface heights in **metres** (physical units), defined on a grid
@@ -412,7 +435,7 @@ def insert_surface_rotated(
 
     Returns
     -------
-    out : ndarray, shape (nx, ny, nz)
+    out : ndarray or LazyDomain, shape (nx, ny, nz)
         Updated geometry with the rotated surface inserted.
     """
     if geometry_3d.ndim != 3:
@@ -426,7 +449,12 @@ def insert_surface_rotated(
     R = _build_rotation_matrix(angle_x, angle_y, angle_z)
     x0, y0, z0 = reference_point
 
-    out = np.array(geometry_3d, copy=True)
+    if isinstance(geometry_3d, LazyDomain):
+        out = geometry_3d.copy()
+        oi, oj, ok = geometry_3d.origin
+    else:
+        out = np.array(geometry_3d, copy=True)
+        oi = oj = ok = 0
 
     for si in range(ns_x):
         for sj in range(ns_y):
@@ -435,9 +463,9 @@ def insert_surface_rotated(
             # Rotate and translate
             world = R @ local + np.array([x0, y0, z0])
             # Convert to grid indices
-            ix = int(np.round(world[0] / dx))
-            iy = int(np.round(world[1] / dy))
-            iz_center = int(np.round(world[2] / dz))
+            ix = int(np.round(world[0] / dx)) + oi
+            iy = int(np.round(world[1] / dy)) + oj
+            iz_center = int(np.round(world[2] / dz)) + ok
 
             # Apply thickness
             T = int(vertical_thickness)
@@ -475,6 +503,8 @@ def insert_surface_rotated(
 def write_geometry(
         geometry_3d: np.ndarray,
         filename: str = "geometry.dat",
+        *,
+        memory_budget=None,
     ) -> None:
     """Write a 3-D integer geometry array in SeidarT-compatible Fortran binary.
 
@@ -482,18 +512,53 @@ def write_geometry(
     ``scipy.io.FortranFile`` so the Fortran solver can read it directly with
     ``read_geometry``.
 
+    A ``LazyDomain`` is streamed to disk in x-slabs, so the dense array is
+    never held in memory.  Dense arrays are streamed the same way when the
+    Fortran-order and ``int32`` copies would exceed the memory budget.
+
     Parameters
     ----------
-    geometry_3d : ndarray, shape (nx, ny, nz)
+    geometry_3d : ndarray or LazyDomain, shape (nx, ny, nz)
         Integer material-ID array.
     filename : str, optional
         Output filename.
+    memory_budget : int or str, optional
+        Limit for the cast temporaries (see ``set_memory_budget``).
     """
+    nx, ny, nz = geometry_3d.shape
+    itemsize = np.dtype(geometry_3d.dtype).itemsize
+    step = slab_size(nx, (itemsize + 4) * ny * nz, memory_budget)
+
+    if isinstance(geometry_3d, LazyDomain):
+        _write_geometry_slabs(
+            geometry_3d.shape, geometry_3d.iter_slabs(step), filename
+        )
+        return
+    if step < nx:
+        slabs = ((i0, geometry_3d[i0:i0 + step]) for i0 in range(0, nx, step))
+        _write_geometry_slabs(geometry_3d.shape, slabs, filename)
+        return
+
     f = FortranFile(filename, "w")
     f.write_record(np.asfortranarray(geometry_3d).astype(np.int32))
     f.close()
 
 
+def _write_geometry_slabs(shape, slabs, filename):
+    """Write one Fortran int32 record from consecutive (k, ny, nz) x-slabs.
+
+    Produces the same bytes as ``FortranFile.write_record`` with its default
+    ``uint32`` record markers, which serialises the array in C order.
+    """
+    nx, ny, nz = shape
+    marker = np.array([nx * ny * nz * 4], dtype=np.uint32)
+    with open(filename, "wb") as fh:
+        marker.tofile(fh)
+        for _, slab in slabs:
+            np.ascontiguousarray(slab, dtype=np.int32).tofile(fh)
+        marker.tofile(fh)
+
+
 # =============================================================================
 # ====================== SeidarT Project Integration ==========================
 # =============================================================================
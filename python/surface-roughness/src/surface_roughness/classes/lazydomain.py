@@ -0,0 +1,342 @@
+"""
+Lazy, copy-on-write 3-D geometry domains.
+
+A SeidarT geometry usually starts life as a 2-D cross-section (or a uniform
+background) that is extruded along y, padded with CPML cells and only then
+stamped with a handful of rough surfaces.  Materialising the full
+(nx, ny, nz) array up front spends most of its memory on repeated copies of
+the section.
+
+``LazyDomain`` keeps the source array untouched and describes extrusion,
+edge padding and tiling as per-axis index maps into it.  The domain is split
+into (bx, by, bz) blocks; a block is copied into private storage only the
+first time a stamp writes to it.  Everything else is read through the index
+maps on demand, so a 2-D section plus a few surfaces never needs a dense 3-D
+array until ``write_geometry`` streams it to disk slab by slab.
+"""
+
+import numpy as np
+
+
+class LazyDomain:
+    """Copy-on-write (nx, ny, nz) label volume backed by a small source array.
+
+    Parameters
+    ----------
+    source : ndarray, shape (sx, sy, sz)
+        Read-only source labels.  Never modified.
+    index_maps : tuple of 3 ndarray of int, optional
+        Per-axis maps from domain indices into *source*.  Defaults to the
+        identity, i.e. the domain is *source* itself.
+    block_shape : tuple of int, optional
+        ``(bx, by, bz)`` size of the blocks that are materialised on write.
+    origin : tuple of int, optional
+        Grid index of the physical domain origin.  :meth:`pad` shifts it so
+        that a ``reference_point`` of ``(0, 0, 0)`` keeps referring to the
+        first cell of the unpadded domain.
+    """
+
+    def __init__(
+            self,
+            source,
+            index_maps=None,
+            *,
+            block_shape=(64, 64, 64),
+            origin=(0, 0, 0),
+        ):
+        source = np.asarray(source)
+        if source.ndim != 3:
+            raise ValueError("source must be a 3-D array.")
+        if index_maps is None:
+            index_maps = tuple(np.arange(n) for n in source.shape)
+        if len(index_maps) != 3:
+            raise ValueError("index_maps must hold one array per axis.")
+
+        self.source = source
+        self.index_maps = tuple(
+            np.asarray(m, dtype=np.intp) for m in index_maps
+        )
+        self.block_shape = tuple(int(b) for b in block_shape)
+        self.origin = tuple(int(o) for o in origin)
+        self._blocks = {}     # (bi, bj, bk) -> ndarray
+        self._owned = set()   # keys whose storage is private to this domain
+
+    # -------------------------
+    # constructors
+    # -------------------------
+
+    @classmethod
+    def extrude(cls, section, ny, **kwargs):
+        """Extrude a 2-D (nx, nz) cross-section along y without copying it.
+
+        Parameters
+        ----------
+        section : ndarray, shape (nx, nz)
+            Integer material-ID array in the x–z plane.
+        ny : int
+            Number of grid points in the y-direction.
+        **kwargs
+            Forwarded to the constructor.
+        """
+        section = np.asarray(section)
+        if section.ndim != 2:
+            raise ValueError("Geometry must be a 2-D array of shape (nx, nz).")
+        nx, nz = section.shape
+        maps = (np.arange(nx), np.zeros(ny, dtype=np.intp), np.arange(nz))
+        return cls(section[:, None, :], maps, **kwargs)
+
+    @classmethod
+    def full(cls, shape, fill_value, dtype=np.int32, **kwargs):
+        """Uniform domain of *shape* holding *fill_value* everywhere."""
+        source = np.full((1, 1, 1), fill_value, dtype=dtype)
+        maps = tuple(np.zeros(int(n), dtype=np.intp) for n in shape)
+        return cls(source, maps, **kwargs)
+
+    # -------------------------
+    # array-like attributes
+    # -------------------------
+
+    ndim = 3
+
+    @property
+    def shape(self):
+        return tuple(len(m) for m in self.index_maps)
+
+    @property
+    def size(self):
+        nx, ny, nz = self.shape
+        return nx * ny * nz
+
+    @property
+    def dtype(self):
+        return self.source.dtype
+
+    @property
+    def materialized_nbytes(self):
+        """Bytes held by materialised blocks (shared blocks counted once)."""
+        seen = {id(b): b.nbytes for b in self._blocks.values()}
+        return int(sum(seen.values()))
+
+    def __repr__(self):
+        return (
+            f"LazyDomain(shape={self.shape}, dtype={self.dtype}, "
+            f"blocks={len(self._blocks)}, origin={self.origin})"
+        )
+
+    def __array__(self, dtype=None, copy=None):
+        arr = self.materialize()
+        if dtype is not None:
+            arr = arr.astype(dtype, copy=False)
+        return arr
+
+    # -------------------------
+    # lazy transforms
+    # -------------------------
+
+    def _require_pristine(self, what):
+        if self._blocks:
+            raise ValueError(
+                f"{what}() must be applied before any surface is stamped."
+            )
+
+    def _derive(self, maps, origin):
+        return LazyDomain(
+            self.source, maps, block_shape=self.block_shape, origin=origin
+        )
+
+    def pad(self, width):
+        """Edge-replicate CPML padding around the domain, as a view.
+
+        Parameters
+        ----------
+        width : int or tuple of 3 int
+            Number of cells added on both sides of each axis.
+
+        Returns
+        -------
+        padded : LazyDomain
+            Domain with shape ``(nx + 2w, ny + 2w, nz + 2w)`` and its origin
+            moved by *width*.
+        """
+        self._require_pristine("pad")
+        widths = np.broadcast_to(np.asarray(width, dtype=np.intp), (3,))
+        if (widths < 0).any():
+            raise ValueError("pad width must be >= 0.")
+        maps = []
+        for m, w in zip(self.index_maps, widths):
+            n = len(m)
+            maps.append(m[np.clip(np.arange(n + 2 * w) - w, 0, n - 1)])
+        origin = tuple(o + int(w) for o, w in zip(self.origin, widths))
+        return self._derive(maps, origin)
+
+    def tile(self, reps):
+        """Periodically repeat the domain *reps* times along each axis.
+
+        Parameters
+        ----------
+        reps : int or tuple of 3 int
+            Repetitions along (x, y, z).
+        """
+        self._require_pristine("tile")
+        reps = np.broadcast_to(np.asarray(reps, dtype=np.intp), (3,))
+        if (reps < 1).any():
+            raise ValueError("tile reps must be >= 1.")
+        maps = [
+            m[np.arange(len(m) * r) % len(m)]
+            for m, r in zip(self.index_maps, reps)
+        ]
+        return self._derive(maps, self.origin)
+
+    def copy(self):
+        """Shallow copy; blocks are shared until either side writes to them."""
+        new = self._derive(self.index_maps, self.origin)
+        new._blocks = dict(self._blocks)
+        self._owned = set()
+        return new
+
+    # -------------------------
+    # block storage
+    # -------------------------
+
+    def _block_slices(self, key):
+        return tuple(
+            slice(k * b, min((k + 1) * b, n))
+            for k, b, n in zip(key, self.block_shape, self.shape)
+        )
+
+    def _gather(self, ix, iy, iz):
+        mx, my, mz = self.index_maps
+        return self.source[np.ix_(mx[ix], my[iy], mz[iz])]
+
+    def _writable_block(self, key):
+        block = self._blocks.get(key)
+        if block is None:
+            sl = self._block_slices(key)
+            block = self._gather(
+                *(np.arange(s.start, s.stop) for s in sl)
+            )
+        elif key not in self._owned:
+            block = block.copy()
+        self._blocks[key] = block
+        self._owned.add(key)
+        return block
+
+    # -------------------------
+    # indexing
+    # -------------------------
+
+    def _normalize_key(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > 3:
+            raise IndexError("too many indices for a 3-D domain.")
+        key = key + (slice(None),) * (3 - len(key))
+
+        idx, squeeze = [], []
+        for axis, (k, n) in enumerate(zip(key, self.shape)):
+            if isinstance(k, (int, np.integer)):
+                k = int(k) + (n if k < 0 else 0)
+                if not 0 <= k < n:
+                    raise IndexError(f"index {k} out of bounds for axis {axis}.")
+                idx.append(np.array([k], dtype=np.intp))
+                squeeze.append(axis)
+            else:
+                sel = np.arange(n)[k]
+                if sel.ndim != 1:
+                    raise IndexError("only per-axis indexing is supported.")
+                idx.append(sel)
+        return idx, tuple(squeeze)
+
+    def _block_groups(self, idx):
+        """Yield (key, per-axis selectors) for every block *idx* touches."""
+        keys = [i // b for i, b in zip(idx, self.block_shape)]
+        for bi in np.unique(keys[0]):
+            sx = keys[0] == bi
+            for bj in np.unique(keys[1]):
+                sy = keys[1] == bj
+                for bk in np.unique(keys[2]):
+                    sz = keys[2] == bk
+                    yield (int(bi), int(bj), int(bk)), (sx, sy, sz)
+
+    def __getitem__(self, key):
+        idx, squeeze = self._normalize_key(key)
+        out = self._gather(*idx)
+        if self._blocks:
+            for bkey, sel in self._block_groups(idx):
+                block = self._blocks.get(bkey)
+                if block is None:
+                    continue
+                starts = [s.start for s in self._block_slices(bkey)]
+                local = [i[s] - o for i, s, o in zip(idx, sel, starts)]
+                out[np.ix_(*sel)] = block[np.ix_(*local)]
+        return out[tuple(0 if a in squeeze else slice(None) for a in range(3))]
+
+    def __setitem__(self, key, value):
+        idx, squeeze = self._normalize_key(key)
+        full_shape = tuple(len(i) for i in idx)
+        kept_shape = tuple(
+            n for a, n in enumerate(full_shape) if a not in squeeze
+        )
+        value = np.broadcast_to(
+            np.asarray(value, dtype=self.dtype), kept_shape
+        ).reshape(full_shape)
+
+        for bkey, sel in self._block_groups(idx):
+            block = self._writable_block(bkey)
+            starts = [s.start for s in self._block_slices(bkey)]
+            local = [i[s] - o for i, s, o in zip(idx, sel, starts)]
+            block[np.ix_(*local)] = value[np.ix_(*sel)]
+
+    def fill_columns(self, k0, k1, value):
+        """Set cells ``k0[i, j] <= k < k1[i, j]`` of every column to *value*.
+
+        Only blocks that contain at least one affected cell are
+        materialised.
+
+        Parameters
+        ----------
+        k0, k1 : ndarray of int, shape (nx, ny)
+            Half-open z-index range per column.
+        value : int
+            Label to write.
+        """
+        nx, ny, nz = self.shape
+        bx, by, bz = self.block_shape
+        for i0 in range(0, nx, bx):
+            for j0 in range(0, ny, by):
+                lo = k0[i0:i0 + bx, j0:j0 + by, None]
+                hi = k1[i0:i0 + bx, j0:j0 + by, None]
+                if not (lo < hi).any():
+                    continue
+                for z0 in range(0, nz, bz):
+                    z1 = min(z0 + bz, nz)
+                    if not ((lo < z1) & (hi > z0) & (lo < hi)).any():
+                        continue
+                    Z = np.arange(z0, z1)[None, None, :]
+                    mask = (Z >= lo) & (Z < hi)
+                    key = (i0 // bx, j0 // by, z0 // bz)
+                    self._writable_block(key)[mask] = value
+
+    # -------------------------
+    # output
+    # -------------------------
+
+    def iter_slabs(self, thickness=None):
+        """Yield ``(i0, slab)`` dense x-slabs of shape (i1 - i0, ny, nz).
+
+        Consecutive slabs concatenate to the full array in C order, which is
+        the byte layout ``write_geometry`` produces for dense arrays.
+
+        Parameters
+        ----------
+        thickness : int, optional
+            Slab thickness in x-cells.  Defaults to the block width.
+        """
+        nx = self.shape[0]
+        step = int(thickness or self.block_shape[0])
+        for i0 in range(0, nx, step):
+            yield i0, self[i0:min(i0 + step, nx)]
+
+    def materialize(self):
+        """Return the full dense (nx, ny, nz) array."""
+        return self[:, :, :]
@@ -0,0 +1,139 @@
+"""
+Level-of-detail (LOD) previews of 3-D label grids.
+
+Multi-GB label grids from ``VolumeBuilder`` or ``build_seidart_surfaces``
+are too large to slice, plot or mesh interactively.  This module builds a
+pyramid of coarser grids by majority vote: every ``f x f x f`` block of
+cells becomes one cell holding the block's most frequent label.  Unlike
+strided subsampling, a thin layer survives as long as it owns the majority
+of the blocks it crosses.
+
+Level ``n`` of a pyramid is downsampled by ``2**n``.  Blocks are counted
+label by label with vectorised reshapes, one x-slab at a time, so inputs
+can be ``np.memmap`` arrays larger than RAM and outputs may be memmaps as
+well.
+"""
+
+import numpy as np
+
+from .memory import slab_size
+
+
+def downsample_labels(
+        labels,
+        factor: int = 2,
+        *,
+        out=None,
+        memory_budget=None,
+    ) -> np.ndarray:
+    """Majority-vote (mode) downsampling of a 3-D label grid.
+
+    Parameters
+    ----------
+    labels : array_like, shape (nx, ny, nz)
+        Integer label grid.  ``np.memmap`` inputs are read one x-slab at a
+        time.
+    factor : int, optional
+        Block edge length in cells.
+    out : ndarray, optional
+        Output array of shape ``ceil(shape / factor)``, e.g. a memmap.
+    memory_budget : int or str, optional
+        Limit for per-slab temporaries (see ``set_memory_budget``).
+
+    Returns
+    -------
+    coarse : ndarray, shape (ceil(nx/f), ceil(ny/f), ceil(nz/f))
+        Most frequent label of each block.  Partial blocks at the upper
+        edges count only their valid cells; ties go to the smallest label.
+    """
+    factor = int(factor)
+    if factor < 1:
+        raise ValueError("factor must be >= 1.")
+    if labels.ndim != 3:
+        raise ValueError("labels must be 3-D, shape (nx, ny, nz).")
+
+    nx, ny, nz = labels.shape
+    cx, cy, cz = (-(-n // factor) for n in labels.shape)
+    if out is None:
+        out = np.empty((cx, cy, cz), dtype=labels.dtype)
+    elif out.shape != (cx, cy, cz):
+        raise ValueError(f"out must have shape {(cx, cy, cz)}.")
+    if factor == 1:
+        out[...] = labels
+        return out
+
+    # Per coarse x-plane: one input slab, one padded mask and two counters
+    itemsize = np.dtype(labels.dtype).itemsize
+    per_plane = factor * ny * nz * itemsize + factor**3 * cy * cz * 2 + 4 * cy * cz
+    step = slab_size(cx, per_plane, memory_budget)
+
+    for c0 in range(0, cx, step):
+        c1 = min(c0 + step, cx)
+        slab = np.asarray(labels[c0 * factor:c1 * factor])
+        ids = np.unique(slab)
+        if ids.size == 1:
+            out[c0:c1] = ids[0]
+            continue
+
+        pad = ((0, (c1 - c0) * factor - slab.shape[0]),
+               (0, cy * factor - ny), (0, cz * factor - nz))
+        best = np.zeros((c1 - c0, cy, cz), dtype=np.int32)
+        mode = np.empty((c1 - c0, cy, cz), dtype=labels.dtype)
+        for label in ids:
+            mask = np.pad(slab == label, pad)
+            count = mask.reshape(
+                c1 - c0, factor, cy, factor, cz, factor
+            ).sum(axis=(1, 3, 5), dtype=np.int32)
+            win = count > best
+            mode[win] = label
+            best[win] = count[win]
+        out[c0:c1] = mode
+    return out
+
+
+def label_pyramid(
+        labels,
+        levels: int = None,
+        *,
+        min_size: int = 8,
+        memory_budget=None,
+    ) -> list:
+    """Build a majority-vote LOD pyramid of a 3-D label grid.
+
+    Each level halves the previous one with :func:`downsample_labels`, so a
+    full pyramid costs little more than its first level.
+
+    Parameters
+    ----------
+    labels : array_like, shape (nx, ny, nz)
+        Full-resolution label grid (level 0; returned as-is, not copied).
+    levels : int, optional
+        Number of coarse levels to build.  By default levels are added until
+        the smallest axis would drop below *min_size* cells.
+    min_size : int, optional
+        Smallest axis length of the coarsest automatic level.
+    memory_budget : int or str, optional
+        Limit for per-slab temporaries (see ``set_memory_budget``).
+
+    Returns
+    -------
+    pyramid : list of ndarray
+        ``pyramid[n]`` is downsampled by ``2**n``.
+    """
+    pyramid = [labels]
+    while levels is None or len(pyramid) <= levels:
+        prev = pyramid[-1]
+        if levels is None and min(prev.shape) // 2 < min_size:
+            break
+        pyramid.append(
+            downsample_labels(prev, 2, memory_budget=memory_budget)
+        )
+    return pyramid
+
+
+def lod_grid(labels, lod: int = 0, *, memory_budget=None) -> np.ndarray:
+    """Return *labels* at pyramid level *lod* (downsampled by ``2**lod``)."""
+    lod = int(lod)
+    if lod < 0:
+        raise ValueError("lod must be >= 0.")
+    return label_pyramid(labels, lod, memory_budget=memory_budget)[lod]
@@ -0,0 +1,339 @@
+"""
+Binary mesh export (PLY, glTF ``.glb``, ``.npz``) for voxelised geometry arrays.
+
+These writers emit the same exposed-face mesh as ``geometry_to_obj`` but
+serialise it straight from NumPy buffers with ``tofile`` / ``tobytes``, so
+export and import are bound by I/O rather than text formatting and parsing.
+
+* **PLY** — binary little-endian, one quad per face with per-face
+  ``material_id`` and ``red/green/blue`` properties.
+* **glTF binary (.glb)** — one mesh with one triangle primitive per
+  material, sharing a single ``float32`` vertex buffer.  Material colours
+  become ``baseColorFactor`` values.
+* **NumPy (.npz)** — flat vertex, quad and per-material offset arrays,
+  ready for ``foreach_set`` in the Blender importer in ``mesh_panel.py``.
+
+Colours come from ``material_colours`` or the built-in palette, exactly as
+for the OBJ/MTL export.  Coordinates are written as-is (no axis swap), so
+all formats line up when imported with the same importer settings.
+"""
+
+import json
+
+import numpy as np
+
+from .objexport import (
+    _compact_vertices,
+    _exposed_quads,
+    _material_lookup,
+    _present_ids,
+    _slab_step,
+)
+
+_GLB_MAGIC = 0x46546C67        # b"glTF"
+_GLB_CHUNK_JSON = 0x4E4F534A   # b"JSON"
+_GLB_CHUNK_BIN = 0x004E4942    # b"BIN\0"
+_GL_FLOAT = 5126
+_GL_UNSIGNED_INT = 5125
+_GL_ARRAY_BUFFER = 34962
+_GL_ELEMENT_ARRAY_BUFFER = 34963
+
+
+def _domain_mesh(geometry_3d, skip_ids, merge_faces, memory_budget):
+    """Exposed-face mesh per material: ``(unique_ids, ijk, faces)``."""
+    if geometry_3d.ndim != 3:
+        raise ValueError("geometry_3d must be 3-D, shape (nx, ny, nz).")
+    skip_ids = set(skip_ids or [])
+    step = _slab_step(geometry_3d, memory_budget)
+    unique_ids = _present_ids(geometry_3d, step, skip_ids)
+    quads = _exposed_quads(geometry_3d, unique_ids, step, merge_faces)
+    ijk, faces = _compact_vertices(quads, geometry_3d.shape)
+    return unique_ids, ijk, faces
+
+
+def geometry_to_ply(
+        geometry_3d: np.ndarray,
+        ply_path: str = "domain.ply",
+        *,
+        dx: float = 1.0,
+        dy: float = 1.0,
+        dz: float = 1.0,
+        material_colours: dict = None,
+        skip_ids: set = None,
+        merge_faces: bool = False,
+        memory_budget=None,
+    ) -> None:
+    """Export the exposed-face mesh as a binary little-endian PLY file.
+
+    Parameters
+    ----------
+    geometry_3d : ndarray, shape (nx, ny, nz)
+        Integer material-ID array (SeidarT convention).
+    ply_path : str, optional
+        Output ``.ply`` file path.
+    dx, dy, dz : float, optional
+        Grid spacings in metres.
+    material_colours : dict, optional
+        ``{material_id: (r, g, b)}`` floats or ``'R/G/B'`` strings.
+    skip_ids : set of int, optional
+        Material IDs whose faces should not be written.
+    merge_faces : bool, optional
+        Merge coplanar faces into rectangles (see ``geometry_to_obj``).
+    memory_budget : int or str, optional
+        Limit for face-extraction temporaries (see ``set_memory_budget``).
+    """
+    unique_ids, ijk, faces = _domain_mesh(
+        geometry_3d, skip_ids, merge_faces, memory_budget
+    )
+    _, get_colour = _material_lookup(None, material_colours)
+
+    verts = (ijk * np.array([dx, dy, dz])).astype("<f4")
+    n_faces = sum(len(f) for f in faces.values())
+    face_dtype = np.dtype([
+        ("n", "u1"), ("v", "<i4", (4,)), ("material_id", "<i4"),
+        ("red", "u1"), ("green", "u1"), ("blue", "u1"),
+    ])
+    records = np.empty(n_faces, dtype=face_dtype)
+    records["n"] = 4
+    start = 0
+    for mid in unique_ids:
+        block = records[start:start + len(faces[mid])]
+        block["v"] = faces[mid]
+        block["material_id"] = mid
+        rgb = np.rint(np.clip(get_colour(mid), 0.0, 1.0) * 255)
+        block["red"], block["green"], block["blue"] = rgb
+        start += len(faces[mid])
+
+    header = (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        "comment Generated by surface_roughness.geometry_to_ply\n"
+        f"element vertex {len(verts)}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        f"element face {n_faces}\n"
+        "property list uchar int vertex_indices\n"
+        "property int material_id\n"
+        "property uchar red\n"
+        "property uchar green\n"
+        "property uchar blue\n"
+        "end_header\n"
+    )
+    with open(ply_path, "wb") as fh:
+        fh.write(header.encode("ascii"))
+        verts.tofile(fh)
+        records.tofile(fh)
+
+    print(
+        f"geometry_to_ply: {len(verts)} vertices, {n_faces} faces, "
+        f"{len(unique_ids)} materials"
+    )
+    print(f"Wrote {ply_path}")
+
+
+def geometry_to_glb(
+        geometry_3d: np.ndarray,
+        glb_path: str = "domain.glb",
+        *,
+        dx: float = 1.0,
+        dy: float = 1.0,
+        dz: float = 1.0,
+        material_names: dict = None,
+        material_colours: dict = None,
+        skip_ids: set = None,
+        merge_faces: bool = False,
+        memory_budget=None,
+    ) -> None:
+    """Export the exposed-face mesh as a binary glTF 2.0 (``.glb``) file.
+
+    The file holds one mesh with one triangle primitive per material; each
+    primitive references a glTF material named after the SeidarT material
+    with its colour as ``baseColorFactor``.
+
+    Parameters
+    ----------
+    geometry_3d : ndarray, shape (nx, ny, nz)
+        Integer material-ID array (SeidarT convention).
+    glb_path : str, optional
+        Output ``.glb`` file path.
+    dx, dy, dz : float, optional
+        Grid spacings in metres.
+    material_names : dict, optional
+        ``{material_id: name_string}``.
+    material_colours : dict, optional
+        ``{material_id: (r, g, b)}`` floats or ``'R/G/B'`` strings.
+    skip_ids : set of int, optional
+        Material IDs whose faces should not be written.
+    merge_faces : bool, optional
+        Merge coplanar faces into rectangles (see ``geometry_to_obj``).
+    memory_budget : int or str, optional
+        Limit for face-extraction temporaries (see ``set_memory_budget``).
+    """
+    unique_ids, ijk, faces = _domain_mesh(
+        geometry_3d, skip_ids, merge_faces, memory_budget
+    )
+    get_name, get_colour = _material_lookup(material_names, material_colours)
+
+    verts = (ijk * np.array([dx, dy, dz])).astype("<f4")
+    blobs = [verts.tobytes()]
+    offset = len(blobs[0])
+    buffer_views = [{
+        "buffer": 0, "byteOffset": 0, "byteLength": offset,
+        "target": _GL_ARRAY_BUFFER,
+    }]
+    accessors = [{
+        "bufferView": 0, "componentType": _GL_FLOAT,
+        "count": len(verts), "type": "VEC3",
+        "min": verts.min(axis=0).tolist() if len(verts) else [0, 0, 0],
+        "max": verts.max(axis=0).tolist() if len(verts) else [0, 0, 0],
+    }]
+    materials, primitives = [], []
+
+    for mid in unique_ids:
+        quads = faces[mid]
+        if len(quads) == 0:
+            continue
+        # Split each quad (0, 1, 2, 3) into triangles (0, 1, 2), (0, 2, 3)
+        tris = quads[:, [0, 1, 2, 0, 2, 3]].astype("<u4")
+        blob = tris.tobytes()
+        buffer_views.append({
+            "buffer": 0, "byteOffset": offset, "byteLength": len(blob),
+            "target": _GL_ELEMENT_ARRAY_BUFFER,
+        })
+        accessors.append({
+            "bufferView": len(buffer_views) - 1,
+            "componentType": _GL_UNSIGNED_INT,
+            "count": tris.size, "type": "SCALAR",
+        })
+        r, g, b = (float(c) for c in get_colour(mid))
+        materials.append({
+            "name": get_name(mid),
+            "pbrMetallicRoughness": {
+                "baseColorFactor": [r, g, b, 1.0],
+                "metallicFactor": 0.0,
+                "roughnessFactor": 1.0,
+            },
+        })
+        primitives.append({
+            "attributes": {"POSITION": 0},
+            "indices": len(accessors) - 1,
+            "material": len(materials) - 1,
+            "mode": 4,
+        })
+        blobs.append(blob)
+        offset += len(blob)
+
+    gltf = {
+        "asset": {
+            "version": "2.0",
+            "generator": "surface_roughness.geometry_to_glb",
+        },
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0, "name": "domain"}],
+        "meshes": [{"name": "domain", "primitives": primitives}],
+        "materials": materials,
+        "buffers": [{"byteLength": offset}],
+        "bufferViews": buffer_views,
+        "accessors": accessors,
+    }
+
+    # Both chunks must be 4-byte aligned: JSON pads with spaces, BIN with 0s
+    json_bytes = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    json_bytes += b" " * (-len(json_bytes) % 4)
+    bin_pad = b"\0" * (-offset % 4)
+    total = 12 + 8 + len(json_bytes) + 8 + offset + len(bin_pad)
+
+    with open(glb_path, "wb") as fh:
+        np.array([_GLB_MAGIC, 2, total], dtype="<u4").tofile(fh)
+        np.array([len(json_bytes), _GLB_CHUNK_JSON], dtype="<u4").tofile(fh)
+        fh.write(json_bytes)
+        np.array([offset + len(bin_pad), _GLB_CHUNK_BIN],
+                 dtype="<u4").tofile(fh)
+        for blob in blobs:
+            fh.write(blob)
+        fh.write(bin_pad)
+
+    n_faces = sum(len(f) for f in faces.values())
+    print(
+        f"geometry_to_glb: {len(verts)} vertices, {n_faces} faces, "
+        f"{len(primitives)} primitives"
+    )
+    print(f"Wrote {glb_path}")
+
+
+def geometry_to_npz(
+        geometry_3d: np.ndarray,
+        npz_path: str = "domain.npz",
+        *,
+        dx: float = 1.0,
+        dy: float = 1.0,
+        dz: float = 1.0,
+        material_names: dict = None,
+        material_colours: dict = None,
+        skip_ids: set = None,
+        merge_faces: bool = False,
+        memory_budget=None,
+    ) -> None:
+    """Export the exposed-face mesh as flat NumPy arrays in an ``.npz``.
+
+    The archive is laid out for ``foreach_set`` in Blender (see the
+    "Import Voxel Mesh" operator in ``meshing/mesh_panel.py``) and is
+    written uncompressed so each array can be read or memory-mapped
+    without decoding:
+
+    * ``vertices`` — ``float32 (V, 3)``
+    * ``faces`` — ``int32 (F, 4)`` quads, grouped by material
+    * ``material_ids`` — ``int32 (M,)``
+    * ``face_offsets`` — ``int64 (M + 1,)``; material *m* owns
+      ``faces[face_offsets[m]:face_offsets[m + 1]]``
+    * ``material_names`` — ``str (M,)``
+    * ``material_colours`` — ``float32 (M, 3)`` in [0, 1]
+
+    Parameters
+    ----------
+    geometry_3d : ndarray, shape (nx, ny, nz)
+        Integer material-ID array (SeidarT convention).
+    npz_path : str, optional
+        Output ``.npz`` file path.
+    dx, dy, dz : float, optional
+        Grid spacings in metres.
+    material_names : dict, optional
+        ``{material_id: name_string}``.
+    material_colours : dict, optional
+        ``{material_id: (r, g, b)}`` floats or ``'R/G/B'`` strings.
+    skip_ids : set of int, optional
+        Material IDs whose faces should not be written.
+    merge_faces : bool, optional
+        Merge coplanar faces into rectangles (see ``geometry_to_obj``).
+    memory_budget : int or str, optional
+        Limit for face-extraction temporaries (see ``set_memory_budget``).
+    """
+    unique_ids, ijk, faces = _domain_mesh(
+        geometry_3d, skip_ids, merge_faces, memory_budget
+    )
+    get_name, get_colour = _material_lookup(material_names, material_colours)
+
+    mids = [mid for mid in unique_ids if len(faces[mid])]
+    counts = [len(faces[mid]) for mid in mids]
+    quads = np.concatenate([faces[mid] for mid in mids]).astype(np.int32) \
+        if mids else np.empty((0, 4), dtype=np.int32)
+
+    np.savez(
+        npz_path,
+        vertices=(ijk * np.array([dx, dy, dz])).astype(np.float32),
+        faces=quads,
+        material_ids=np.array(mids, dtype=np.int32),
+        face_offsets=np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        material_names=np.array([get_name(mid) for mid in mids], dtype=str),
+        material_colours=np.array(
+            [get_colour(mid) for mid in mids], dtype=np.float32
+        ).reshape(-1, 3),
+    )
+
+    print(
+        f"geometry_to_npz: {len(ijk)} vertices, {len(quads)} faces, "
+        f"{len(mids)} materials"
+    )
+    print(f"Wrote {npz_path}")
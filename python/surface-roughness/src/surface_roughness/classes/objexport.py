@@ -10,8 +10,18 @@ The MTL file writes ``Kd`` lines in the same format that the SeidarT
 ``geometry → OBJ → Blender → OBJ → Domain3D`` is seamless.
 """
 
+import os
+import shutil
+import tempfile
+
 import numpy as np
 
+from .lod import lod_grid
+from .memory import slab_size
+
+# Cells per x-slab for streaming export when no memory budget is set.
+_STREAM_SLAB_CELLS = 2**24
+
 # Default distinguishable palette (12 colours).  Index by material_id % len.
 _DEFAULT_PALETTE = [
     (0.80, 0.80, 0.80),  # 0  light grey  (air / background)
@@ -35,6 +45,398 @@ def _rgb_string_to_float(rgb_str: str):
     return tuple(int(p) / 255.0 for p in parts)
 
 
+def _material_lookup(material_names=None, material_colours=None):
+    """Build ``(name_of, colour_of)`` resolvers for material IDs.
+
+    Names default to ``material_<id>``; colours accept (r, g, b) floats or
+    ``'R/G/B'`` strings and default to ``_DEFAULT_PALETTE``.
+    """
+    material_names = material_names or {}
+    material_colours = material_colours or {}
+
+    def _get_name(mid):
+        return material_names.get(mid, f"material_{mid}")
+
+    def _get_colour(mid):
+        c = material_colours.get(mid)
+        if c is None:
+            return _DEFAULT_PALETTE[mid % len(_DEFAULT_PALETTE)]
+        if isinstance(c, str):
+            return _rgb_string_to_float(c)
+        return tuple(c)
+
+    return _get_name, _get_colour
+
+
+def _write_mtl(mtl_path, unique_ids, get_name, get_colour,
+               generator="geometry_to_obj"):
+    """Write one ``newmtl`` block per material ID."""
+    with open(mtl_path, "w") as fm:
+        fm.write(f"# Generated by surface_roughness.{generator}\n\n")
+        for mid in unique_ids:
+            name = get_name(mid)
+            r, g, b = get_colour(mid)
+            fm.write(f"newmtl {name}\n")
+            fm.write(f"Kd {r:.4f} {g:.4f} {b:.4f}\n")
+            fm.write(f"Ka {r * 0.2:.4f} {g * 0.2:.4f} {b * 0.2:.4f}\n")
+            fm.write("Ks 0.1000 0.1000 0.1000\n")
+            fm.write("Ns 50.0\n")
+            fm.write("d 1.0\n")
+            fm.write("illum 2\n\n")
+
+
+def _slab_step(geometry_3d, memory_budget=None):
+    """x-slab thickness for face extraction within the memory budget."""
+    nx, ny, nz = geometry_3d.shape
+    itemsize = np.dtype(geometry_3d.dtype).itemsize
+    return slab_size(nx, (itemsize + 4) * (ny + 2) * (nz + 2), memory_budget)
+
+
+def _present_ids(geometry_3d, step, skip_ids=()):
+    """Sorted material IDs present in the domain, minus *skip_ids*."""
+    present = set()
+    for i0 in range(0, geometry_3d.shape[0], step):
+        present.update(np.unique(geometry_3d[i0:i0 + step]).tolist())
+    return sorted(present - set(skip_ids))
+
+
+def _padded_slab(geometry_3d, i0, i1):
+    """Copy x-slab ``[i0, i1)`` with a one-cell halo, padding with -1.
+
+    The halo holds the neighbouring x-slices where they exist, so faces on
+    slab boundaries are classified exactly as for the whole domain.
+    """
+    nx, ny, nz = geometry_3d.shape
+    lo, hi = max(i0 - 1, 0), min(i1 + 1, nx)
+    padded = np.full((i1 - i0 + 2, ny + 2, nz + 2), -1,
+                     dtype=geometry_3d.dtype)
+    padded[lo - i0 + 1:hi - i0 + 1, 1:-1, 1:-1] = geometry_3d[lo:hi]
+    return padded
+
+
+# Exposed-face table: (neighbour offset, quad corners as (di, dj, dk) vertex
+# offsets from cell (i, j, k)), wound so every normal points out of the cell.
+_FACE_CORNERS = (
+    ((1, 0, 0), ((1, 0, 0), (1, 1, 0), (1, 1, 1), (1, 0, 1))),    # +x
+    ((-1, 0, 0), ((0, 0, 0), (0, 0, 1), (0, 1, 1), (0, 1, 0))),   # -x
+    ((0, 1, 0), ((0, 1, 0), (0, 1, 1), (1, 1, 1), (1, 1, 0))),    # +y
+    ((0, -1, 0), ((0, 0, 0), (1, 0, 0), (1, 0, 1), (0, 0, 1))),   # -y
+    ((0, 0, 1), ((0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1))),    # +z
+    ((0, 0, -1), ((0, 0, 0), (0, 1, 0), (1, 1, 0), (1, 0, 0))),   # -z
+)
+
+
+def _lattice_id(i, j, k, ny, nz):
+    """Vertex ID of lattice point (i, j, k) on the (nx+1, ny+1, nz+1) grid."""
+    return (i * (ny + 1) + j) * (nz + 1) + k
+
+
+def _lattice_ijk(ids, ny, nz):
+    """Inverse of ``_lattice_id``: (V,) vertex IDs to (V, 3) lattice indices."""
+    ijk = np.empty((ids.size, 3), dtype=np.int64)
+    ijk[:, 0], rem = np.divmod(ids, (ny + 1) * (nz + 1))
+    ijk[:, 1], ijk[:, 2] = np.divmod(rem, nz + 1)
+    return ijk
+
+
+def _merge_rectangles(exposed, axis):
+    """Greedily merge exposed unit faces with normal *axis* into rectangles.
+
+    Within every slice normal to *axis*, runs of faces along the last
+    in-plane axis are found first; identical runs on consecutive rows of the
+    other in-plane axis are then fused.  All slices are processed at once.
+
+    Returns
+    -------
+    start, extent : ndarray of int64, shape (R, 3)
+        Lowest cell index and size (in cells) of each rectangle.  The extent
+        along *axis* is always 1.
+    """
+    u_axis, v_axis = (a for a in range(3) if a != axis)
+    E = np.moveaxis(exposed, (axis, u_axis, v_axis), (0, 1, 2))
+    edges = np.diff(
+        np.pad(E, ((0, 0), (0, 0), (1, 1))).astype(np.int8), axis=2
+    )
+    d, u, v0 = np.nonzero(edges == 1)
+    v1 = np.nonzero(edges == -1)[2]
+
+    order = np.lexsort((u, v1, v0, d))
+    d, u, v0, v1 = d[order], u[order], v0[order], v1[order]
+    new = np.ones(d.size, dtype=bool)
+    new[1:] = ((d[1:] != d[:-1]) | (v0[1:] != v0[:-1])
+               | (v1[1:] != v1[:-1]) | (u[1:] != u[:-1] + 1))
+    first = np.nonzero(new)[0]
+    last = np.append(first[1:], d.size)[:first.size] - 1
+
+    start = np.empty((first.size, 3), dtype=np.int64)
+    extent = np.ones((first.size, 3), dtype=np.int64)
+    start[:, axis] = d[first]
+    start[:, u_axis] = u[first]
+    start[:, v_axis] = v0[first]
+    extent[:, u_axis] = u[last] - u[first] + 1
+    extent[:, v_axis] = v1[first] - v0[first]
+    return start, extent
+
+
+def _mask_quads(exposed, axis, corners, i0, ny, nz, merge=False):
+    """Quads for the faces flagged in *exposed* (one orientation).
+
+    Parameters
+    ----------
+    exposed : ndarray of bool, shape (sx, ny, nz)
+        Cells of an x-slab starting at *i0* whose face is emitted.
+    axis : int
+        Normal axis of the faces.
+    corners : sequence of 4 (di, dj, dk)
+        Corner offsets from ``_FACE_CORNERS``; their order sets the winding.
+    merge : bool, optional
+        Merge coplanar faces into rectangles (see ``_merge_rectangles``).
+
+    Returns
+    -------
+    quads : ndarray of int64, shape (F, 4)
+        Lattice vertex IDs (see ``_lattice_id``) of each quad's corners.
+    """
+    if merge:
+        start, extent = _merge_rectangles(exposed, axis)
+    else:
+        start = np.stack(np.nonzero(exposed), axis=1).astype(np.int64)
+        extent = np.ones_like(start)
+    start[:, 0] += i0
+    return np.stack([
+        _lattice_id(*(start + np.array(c) * extent).T, ny, nz)
+        for c in corners
+    ], axis=1)
+
+
+def _slab_quads(padded, i0, mid, ny, nz, merge=False):
+    """Exposed quads of material *mid* in a padded x-slab.
+
+    Parameters
+    ----------
+    merge : bool, optional
+        Merge coplanar faces into rectangles (see ``_merge_rectangles``).
+
+    Returns
+    -------
+    quads : ndarray of int64, shape (F, 4)
+        Lattice vertex IDs (see ``_lattice_id``) of each quad's corners.
+    """
+    core = padded[1:-1, 1:-1, 1:-1]
+    mask = core == mid
+    sx, sy, sz = core.shape
+    quads = []
+    for (oi, oj, ok), corners in _FACE_CORNERS:
+        neighbour = padded[1 + oi:1 + oi + sx, 1 + oj:1 + oj + sy,
+                           1 + ok:1 + ok + sz]
+        axis = (oi != 0, oj != 0, ok != 0).index(True)
+        quads.append(_mask_quads(mask & (neighbour != mid), axis, corners,
+                                 i0, ny, nz, merge))
+    return np.concatenate(quads)
+
+
+def _slab_interface_quads(padded, i0, ny, nz, skip_ids, merge=False):
+    """Exposed quads of a padded x-slab, keyed by interface.
+
+    A face between labels ``a < b`` is emitted once, under key ``(a, b)``,
+    wound so that its normal points from *a* into *b*.  Faces on the domain
+    boundary go under key ``(a,)`` with outward normals.  Faces whose both
+    sides are in *skip_ids* are dropped.
+
+    Returns
+    -------
+    quads : dict
+        ``{key: [ndarray (F, 4) of lattice vertex IDs, ...]}``.
+    """
+    core = padded[1:-1, 1:-1, 1:-1]
+    sx, sy, sz = core.shape
+    out = {}
+    for (oi, oj, ok), corners in _FACE_CORNERS:
+        neighbour = padded[1 + oi:1 + oi + sx, 1 + oj:1 + oj + sy,
+                           1 + ok:1 + ok + sz]
+        axis = (oi != 0, oj != 0, ok != 0).index(True)
+
+        # Outer domain faces, per material
+        outer = neighbour == -1
+        for a in np.unique(core[outer]).tolist():
+            if a in skip_ids:
+                continue
+            out.setdefault((a,), []).append(_mask_quads(
+                outer & (core == a), axis, corners, i0, ny, nz, merge))
+
+        # Internal faces, once each: only from the + side of every pair
+        if oi + oj + ok < 0:
+            continue
+        internal = (neighbour != -1) & (core != neighbour)
+        pairs = np.unique(
+            np.stack([core[internal], neighbour[internal]], axis=1), axis=0
+        )
+        for c, n in pairs.tolist():
+            if c in skip_ids and n in skip_ids:
+                continue
+            mask = internal & (core == c) & (neighbour == n)
+            # + face of c points from c into n; reverse it when n < c
+            winding = corners if c < n else corners[::-1]
+            out.setdefault((min(c, n), max(c, n)), []).append(
+                _mask_quads(mask, axis, winding, i0, ny, nz, merge))
+    return out
+
+
+def _exposed_quads(geometry_3d, unique_ids, step, merge=False):
+    """Collect exposed quads per material, one x-slab of *step* at a time.
+
+    Returns
+    -------
+    quads : dict
+        ``{material_id: ndarray (F, 4) of lattice vertex IDs}``.
+    """
+    nx, ny, nz = geometry_3d.shape
+    parts = {mid: [] for mid in unique_ids}
+    for i0 in range(0, nx, step):
+        padded = _padded_slab(geometry_3d, i0, min(i0 + step, nx))
+        for mid in unique_ids:
+            parts[mid].append(_slab_quads(padded, i0, mid, ny, nz, merge))
+    return {
+        mid: np.concatenate(p) if p else np.empty((0, 4), dtype=np.int64)
+        for mid, p in parts.items()
+    }
+
+
+def _interface_quads(geometry_3d, skip_ids, step, merge=False):
+    """Collect quads keyed by interface (see ``_slab_interface_quads``).
+
+    Returns
+    -------
+    quads : dict
+        ``{(a, b) or (a,): ndarray (F, 4) of lattice vertex IDs}``, with
+        material pairs first and outer faces last, each sorted by ID.
+    """
+    nx, ny, nz = geometry_3d.shape
+    parts = {}
+    for i0 in range(0, nx, step):
+        padded = _padded_slab(geometry_3d, i0, min(i0 + step, nx))
+        slab = _slab_interface_quads(padded, i0, ny, nz, skip_ids, merge)
+        for key, q in slab.items():
+            parts.setdefault(key, []).extend(q)
+    keys = sorted(parts, key=lambda k: (len(k) == 1, k))
+    return {key: np.concatenate(parts[key]) for key in keys}
+
+
+def _compact_vertices(quads, shape):
+    """Renumber lattice vertex IDs to a dense 0-based vertex list.
+
+    Parameters
+    ----------
+    quads : dict
+        ``{group_key: ndarray (F, 4) of lattice vertex IDs}``.
+    shape : tuple of int
+        Domain shape ``(nx, ny, nz)``.
+
+    Returns
+    -------
+    ijk : ndarray of int64, shape (V, 3)
+        Lattice coordinates of the used vertices, in lattice-ID order.
+    faces : dict
+        ``{group_key: ndarray (F, 4)}`` of 0-based indices into *ijk*.
+    """
+    _, ny, nz = shape
+    mids = list(quads)
+    counts = [len(quads[m]) for m in mids]
+    all_ids = np.concatenate([quads[m].ravel() for m in mids]) \
+        if mids else np.empty(0, dtype=np.int64)
+    used, inverse = np.unique(all_ids, return_inverse=True)
+    inverse = inverse.reshape(-1, 4)
+    ijk = _lattice_ijk(used, ny, nz)
+
+    faces, start = {}, 0
+    for mid, n in zip(mids, counts):
+        faces[mid] = inverse[start:start + n]
+        start += n
+    return ijk, faces
+
+
+def _stream_obj_body(fo, geometry_3d, step, slab_groups, spacing, spool_dir):
+    """Write OBJ vertices slab by slab; spool faces per group to temp files.
+
+    Each x-slab's quads are renumbered on the fly.  Vertices on the lattice
+    plane shared with the previous slab were already written, so their
+    global indices are carried across the seam instead of being emitted
+    twice.  Only one slab plus one seam plane is held in memory.
+
+    Parameters
+    ----------
+    fo : file
+        Open OBJ text file, positioned where vertex lines should start.
+    slab_groups : callable
+        ``slab_groups(padded, i0) -> {key: ndarray (F, 4) of lattice IDs}``.
+    spacing : sequence of 3 float
+        ``(dx, dy, dz)``.
+    spool_dir : str
+        Directory for the per-group face spool files.
+
+    Returns
+    -------
+    n_verts : int
+        Number of vertices written.
+    spools : dict
+        ``{key: (file, n_faces)}``; each file holds 1-indexed ``f`` lines.
+    """
+    nx, ny, nz = geometry_3d.shape
+    plane = (ny + 1) * (nz + 1)
+    spacing = np.asarray(spacing, dtype=float)
+    n_verts = 0
+    spools = {}
+    seam_ids = np.empty(0, dtype=np.int64)
+    seam_index = np.empty(0, dtype=np.int64)
+
+    for i0 in range(0, nx, step):
+        i1 = min(i0 + step, nx)
+        groups = slab_groups(_padded_slab(geometry_3d, i0, i1), i0)
+        groups = {k: q for k, q in groups.items() if len(q)}
+        if not groups:
+            seam_ids = seam_index = np.empty(0, dtype=np.int64)
+            continue
+        ids = np.unique(np.concatenate([q.ravel() for q in groups.values()]))
+
+        # Reuse indices of seam vertices written by the previous slab
+        index = np.empty(ids.size, dtype=np.int64)
+        known = np.zeros(ids.size, dtype=bool)
+        if seam_ids.size:
+            pos = np.minimum(np.searchsorted(seam_ids, ids), seam_ids.size - 1)
+            known = seam_ids[pos] == ids
+            index[known] = seam_index[pos[known]]
+        new = ~known
+        index[new] = n_verts + np.arange(np.count_nonzero(new))
+        n_verts += np.count_nonzero(new)
+        _write_rows(fo, "v %.6f %.6f %.6f\n",
+                    _lattice_ijk(ids[new], ny, nz) * spacing)
+
+        for key, q in groups.items():
+            spool, count = spools.get(key) or (
+                tempfile.TemporaryFile("w+", dir=spool_dir), 0
+            )
+            _write_rows(spool, "f %d %d %d %d\n",
+                        index[np.searchsorted(ids, q)] + 1)  # 1-indexed
+            spools[key] = (spool, count + len(q))
+
+        on_seam = ids // plane == i1
+        seam_ids, seam_index = ids[on_seam], index[on_seam]
+
+    return n_verts, spools
+
+
+def _write_rows(fh, fmt, rows, chunk=100_000):
+    """Write *rows* with the one-line %-format *fmt* in bulk.
+
+    Each chunk is formatted by a single C-level ``%`` call on a repeated
+    format string instead of one Python call per line.
+    """
+    rows = np.asarray(rows)
+    for r0 in range(0, len(rows), chunk):
+        block = rows[r0:r0 + chunk]
+        fh.write((fmt * len(block)) % tuple(block.ravel().tolist()))
+
+
 def geometry_to_obj(
         geometry_3d: np.ndarray,
         obj_path: str = "domain.obj",
@@ -45,6 +447,11 @@ def geometry_to_obj(
         material_names: dict = None,
         material_colours: dict = None,
         skip_ids: set = None,
+        merge_faces: bool = False,
+        interfaces: bool = False,
+        stream: bool = False,
+        memory_budget=None,
+        lod: int = 0,
     ) -> None:
     """Export a 3-D integer geometry array as Wavefront OBJ + MTL files.
 
@@ -54,7 +461,9 @@ def geometry_to_obj(
 
     After editing in Blender the user can re-export OBJ + MTL and feed them
     into ``seidart.routines.classes.Domain3D`` / ``VolumeBuilder`` for
-    re-voxelisation.
+    re-voxelisation.  ``VolumeBuilder`` recognises unmodified exports as
+    grid-aligned and rebuilds the labels exactly by parity fill when its
+    grid points are the cell centres, ``x = (i + 0.5) * dx`` etc.
 
     Parameters
     ----------
@@ -76,29 +485,57 @@ def geometry_to_obj(
     skip_ids : set of int, optional
         Material IDs whose faces should **not** be written (e.g. ``{0}``
         to suppress the air/background volume and see only the subsurface).
+    merge_faces : bool, optional
+        Greedy meshing: merge coplanar exposed faces of the same material
+        into rectangles, slice by slice and per orientation.  Flat
+        interfaces and domain walls collapse to a few quads, typically
+        cutting the face count 10–100×.  The covered surface is identical,
+        but merged quads meet smaller neighbours in T-junctions.
+    interfaces : bool, optional
+        Write every internal interface once instead of once per side.
+        Faces between materials ``a < b`` are grouped as ``g <a>__<b>``
+        (normals pointing from *a* into *b*, ``usemtl`` of the first
+        material not in *skip_ids*); faces on the domain boundary are
+        grouped per material as ``g <name>__outer``.
+    stream : bool, optional
+        Process the domain in x-slabs and write each slab's vertices and
+        faces as soon as they are extracted, so memory use stays flat
+        regardless of domain size.  Faces are spooled to temporary files
+        next to *obj_path* and appended per group at the end.  Enabled
+        automatically when *memory_budget* forces slab processing.
+    memory_budget : int or str, optional
+        Limit for the padded-array and mask temporaries (see
+        ``set_memory_budget``).  Faces are then collected one x-slab at a
+        time instead of from a padded copy of the whole domain.
+    lod : int, optional
+        Export a majority-vote preview downsampled by ``2**lod`` (see
+        ``label_pyramid``) instead of the full grid.  Spacings are scaled to
+        match, so the preview overlays the full-resolution mesh.
     """
     if geometry_3d.ndim != 3:
         raise ValueError("geometry_3d must be 3-D, shape (nx, ny, nz).")
+    if lod:
+        geometry_3d = lod_grid(geometry_3d, lod, memory_budget=memory_budget)
+        dx, dy, dz = (d * 2**lod for d in (dx, dy, dz))
 
     nx, ny, nz = geometry_3d.shape
     skip_ids = set(skip_ids or [])
-    unique_ids = sorted(set(np.unique(geometry_3d)) - skip_ids)
-
-    if material_names is None:
-        material_names = {}
-    if material_colours is None:
-        material_colours = {}
-
-    def _get_name(mid):
-        return material_names.get(mid, f"material_{mid}")
-
-    def _get_colour(mid):
-        c = material_colours.get(mid)
-        if c is None:
-            return _DEFAULT_PALETTE[mid % len(_DEFAULT_PALETTE)]
-        if isinstance(c, str):
-            return _rgb_string_to_float(c)
-        return tuple(c)
+    step = _slab_step(geometry_3d, memory_budget)
+    stream = stream or step < nx
+    if stream:
+        step = min(step, max(1, _STREAM_SLAB_CELLS // (ny * nz)))
+    unique_ids = _present_ids(geometry_3d, step, skip_ids)
+    _get_name, _get_colour = _material_lookup(material_names,
+                                              material_colours)
+
+    def _group_label(key):
+        """``(group name, material name)`` for a material ID or interface."""
+        if not interfaces:
+            return _get_name(key), _get_name(key)
+        mtl = _get_name(next(m for m in key if m not in skip_ids))
+        if len(key) == 2:
+            return f"{_get_name(key[0])}__{_get_name(key[1])}", mtl
+        return f"{_get_name(key[0])}__outer", mtl
 
     # ------------------------------------------------------------------
     # Write MTL
@@ -107,131 +544,94 @@ def geometry_to_obj(
     mtl_path = base + ".mtl"
     mtl_basename = mtl_path.rsplit("/", 1)[-1]
 
-    with open(mtl_path, "w") as fm:
-        fm.write("# Generated by surface_roughness.geometry_to_obj\n\n")
-        for mid in unique_ids:
-            name = _get_name(mid)
-            r, g, b = _get_colour(mid)
-            fm.write(f"newmtl {name}\n")
-            fm.write(f"Kd {r:.4f} {g:.4f} {b:.4f}\n")
-            fm.write(f"Ka {r * 0.2:.4f} {g * 0.2:.4f} {b * 0.2:.4f}\n")
-            fm.write("Ks 0.1000 0.1000 0.1000\n")
-            fm.write("Ns 50.0\n")
-            fm.write("d 1.0\n")
-            fm.write("illum 2\n\n")
+    _write_mtl(mtl_path, unique_ids, _get_name, _get_colour)
 
-    # ------------------------------------------------------------------
-    # Collect exposed faces per material
-    # ------------------------------------------------------------------
-    mat_faces = {mid: [] for mid in unique_ids}
-
-    # Pad with -1 on every face so boundary faces are always detected
-    padded = np.full((nx + 2, ny + 2, nz + 2), -1, dtype=geometry_3d.dtype)
-    padded[1:-1, 1:-1, 1:-1] = geometry_3d
-
-    for mid in unique_ids:
-        mask = padded == mid
-
-        # +x face
-        exposed = mask[1:-1, 1:-1, 1:-1] & (padded[2:, 1:-1, 1:-1] != mid)
-        ii, jj, kk = np.where(exposed)
-        for i, j, k in zip(ii, jj, kk):
-            x = (i + 1) * dx
-            mat_faces[mid].append((
-                (x, j*dy, k*dz), (x, (j+1)*dy, k*dz),
-                (x, (j+1)*dy, (k+1)*dz), (x, j*dy, (k+1)*dz),
-            ))
-
-        # -x face
-        exposed = mask[1:-1, 1:-1, 1:-1] & (padded[:-2, 1:-1, 1:-1] != mid)
-        ii, jj, kk = np.where(exposed)
-        for i, j, k in zip(ii, jj, kk):
-            x = i * dx
-            mat_faces[mid].append((
-                (x, j*dy, k*dz), (x, j*dy, (k+1)*dz),
-                (x, (j+1)*dy, (k+1)*dz), (x, (j+1)*dy, k*dz),
-            ))
-
-        # +y face
-        exposed = mask[1:-1, 1:-1, 1:-1] & (padded[1:-1, 2:, 1:-1] != mid)
-        ii, jj, kk = np.where(exposed)
-        for i, j, k in zip(ii, jj, kk):
-            y = (j + 1) * dy
-            mat_faces[mid].append((
-                (i*dx, y, k*dz), (i*dx, y, (k+1)*dz),
-                ((i+1)*dx, y, (k+1)*dz), ((i+1)*dx, y, k*dz),
-            ))
-
-        # -y face
-        exposed = mask[1:-1, 1:-1, 1:-1] & (padded[1:-1, :-2, 1:-1] != mid)
-        ii, jj, kk = np.where(exposed)
-        for i, j, k in zip(ii, jj, kk):
-            y = j * dy
-            mat_faces[mid].append((
-                (i*dx, y, k*dz), ((i+1)*dx, y, k*dz),
-                ((i+1)*dx, y, (k+1)*dz), (i*dx, y, (k+1)*dz),
-            ))
-
-        # +z face
-        exposed = mask[1:-1, 1:-1, 1:-1] & (padded[1:-1, 1:-1, 2:] != mid)
-        ii, jj, kk = np.where(exposed)
-        for i, j, k in zip(ii, jj, kk):
-            z = (k + 1) * dz
-            mat_faces[mid].append((
-                (i*dx, j*dy, z), ((i+1)*dx, j*dy, z),
-                ((i+1)*dx, (j+1)*dy, z), (i*dx, (j+1)*dy, z),
-            ))
-
-        # -z face
-        exposed = mask[1:-1, 1:-1, 1:-1] & (padded[1:-1, 1:-1, :-2] != mid)
-        ii, jj, kk = np.where(exposed)
-        for i, j, k in zip(ii, jj, kk):
-            z = k * dz
-            mat_faces[mid].append((
-                (i*dx, j*dy, z), (i*dx, (j+1)*dy, z),
-                ((i+1)*dx, (j+1)*dy, z), ((i+1)*dx, j*dy, z),
-            ))
+    if stream:
+        _write_obj_stream(
+            obj_path, mtl_basename, geometry_3d, step, unique_ids,
+            skip_ids, merge_faces, interfaces, (dx, dy, dz), _group_label,
+        )
+        print(f"Wrote {obj_path} and {mtl_path}")
+        return
 
     # ------------------------------------------------------------------
-    # Write OBJ — deduplicate vertices globally
+    # Collect exposed faces per material as lattice vertex IDs
     # ------------------------------------------------------------------
-    vert_map = {}
-    verts = []
-
-    def _vert_index(v):
-        key = (round(v[0], 8), round(v[1], 8), round(v[2], 8))
-        if key not in vert_map:
-            vert_map[key] = len(verts) + 1  # OBJ is 1-indexed
-            verts.append(key)
-        return vert_map[key]
-
-    indexed_faces = {}
-    for mid in unique_ids:
-        indexed_faces[mid] = [
-            tuple(_vert_index(v) for v in quad)
-            for quad in mat_faces[mid]
-        ]
-
-    total_faces = sum(len(fl) for fl in indexed_faces.values())
+    if interfaces:
+        quads = _interface_quads(geometry_3d, skip_ids, step, merge_faces)
+    else:
+        quads = _exposed_quads(geometry_3d, unique_ids, step, merge_faces)
+    ijk, faces = _compact_vertices(quads, geometry_3d.shape)
+    verts = ijk * np.array([dx, dy, dz])
+
+    total_faces = sum(len(f) for f in faces.values())
     print(
         f"geometry_to_obj: {len(verts)} vertices, {total_faces} faces, "
         f"{len(unique_ids)} materials"
     )
 
+    # ------------------------------------------------------------------
+    # Write OBJ
+    # ------------------------------------------------------------------
     with open(obj_path, "w") as fo:
         fo.write("# Generated by surface_roughness.geometry_to_obj\n")
         fo.write(f"mtllib {mtl_basename}\n\n")
 
-        for x, y, z in verts:
-            fo.write(f"v {x:.6f} {y:.6f} {z:.6f}\n")
+        _write_rows(fo, "v %.6f %.6f %.6f\n", verts)
         fo.write("\n")
 
-        for mid in unique_ids:
-            name = _get_name(mid)
-            fo.write(f"g {name}\n")
-            fo.write(f"usemtl {name}\n")
-            for f in indexed_faces[mid]:
-                fo.write(f"f {f[0]} {f[1]} {f[2]} {f[3]}\n")
+        for key in faces:
+            label, mtl = _group_label(key)
+            fo.write(f"g {label}\n")
+            fo.write(f"usemtl {mtl}\n")
+            _write_rows(fo, "f %d %d %d %d\n", faces[key] + 1)  # 1-indexed
             fo.write("\n")
 
     print(f"Wrote {obj_path} and {mtl_path}")
+
+
+def _write_obj_stream(obj_path, mtl_basename, geometry_3d, step, unique_ids,
+                      skip_ids, merge, interfaces, spacing, group_label):
+    """Streaming body of ``geometry_to_obj`` (see its *stream* option)."""
+    _, ny, nz = geometry_3d.shape
+
+    def _slab_groups(padded, i0):
+        if interfaces:
+            return {
+                key: np.concatenate(q) for key, q in _slab_interface_quads(
+                    padded, i0, ny, nz, skip_ids, merge).items()
+            }
+        return {
+            mid: _slab_quads(padded, i0, mid, ny, nz, merge)
+            for mid in unique_ids
+        }
+
+    spool_dir = os.path.dirname(os.path.abspath(obj_path))
+    with open(obj_path, "w") as fo:
+        fo.write("# Generated by surface_roughness.geometry_to_obj\n")
+        fo.write(f"mtllib {mtl_basename}\n\n")
+
+        n_verts, spools = _stream_obj_body(
+            fo, geometry_3d, step, _slab_groups, spacing, spool_dir
+        )
+        fo.write("\n")
+
+        if interfaces:
+            order = sorted(spools, key=lambda k: (len(k) == 1, k))
+        else:
+            order = sorted(spools)
+        for key in order:
+            spool, _ = spools[key]
+            label, mtl = group_label(key)
+            fo.write(f"g {label}\n")
+            fo.write(f"usemtl {mtl}\n")
+            spool.seek(0)
+            shutil.copyfileobj(spool, fo)
+            spool.close()
+            fo.write("\n")
+
+    total_faces = sum(n for _, n in spools.values())
+    print(
+        f"geometry_to_obj: {n_verts} vertices, {total_faces} faces, "
+        f"{len(unique_ids)} materials (streamed in x-slabs of {step})"
+    )
@@ -0,0 +1,209 @@
+"""
+Per-cell material property volumes from a 3-D label grid.
+
+A label grid holds one material ID per cell; the solver wants one value
+per cell for each physical property (density, porosity, permeability,
+...).  :func:`property_volumes` turns the per-material values into a dense
+lookup table indexed by label and gathers from it chunk by chunk into
+``float32`` memmaps, so neither the label grid nor the outputs need to fit
+in memory and no full-size ``float64`` temporaries are created.
+
+Each output is a Fortran unformatted file with a single ``float32`` record
+(the same record framing as ``write_geometry``), stored column-major by
+default so the solver can read it as an ``(nx, ny, nz)`` array directly.
+Chunks run along the slowest axis of the chosen order, so every chunk is a
+contiguous block of the file.
+
+Optional stochastic perturbations multiply a property of one material by
+``1 + std * field``, where ``field`` is a unit-variance Gaussian random
+field evaluated only at that material's cells.
+"""
+
+import json
+import os
+
+import numpy as np
+import gstools as gs
+
+from .memory import slab_size
+
+DEFAULT_PROPERTIES = ("density", "porosity", "permeability")
+
+
+def property_table(materials, properties=DEFAULT_PROPERTIES, fill=np.nan):
+    """Dense label -> value lookup tables.
+
+    Parameters
+    ----------
+    materials : dict, list or str
+        ``{label: {property: value}}``, a list of SeidarT material entries
+        (dicts with an ``'id'`` key), or the path to a SeidarT project JSON
+        whose ``'Materials'`` list is used.
+    properties : sequence of str, optional
+        Property names to tabulate.
+    fill : float, optional
+        Value for labels without an entry and for missing (``None``)
+        properties.
+
+    Returns
+    -------
+    tables : dict
+        ``{property: float32 ndarray (max_label + 1,)}``.
+    """
+    if isinstance(materials, (str, os.PathLike)):
+        with open(materials, "r") as fh:
+            materials = json.load(fh)["Materials"]
+    if not isinstance(materials, dict):
+        materials = {int(m["id"]): m for m in materials}
+    if any(int(label) < 0 for label in materials):
+        raise ValueError("Material labels must be non-negative.")
+
+    size = max((int(label) for label in materials), default=-1) + 1
+    tables = {}
+    for prop in properties:
+        table = np.full(size, fill, dtype=np.float32)
+        for label, entry in materials.items():
+            value = entry.get(prop)
+            if value is not None:
+                table[int(label)] = value
+        tables[prop] = table
+    return tables
+
+
+def _gather(labels, table, fill):
+    """Look up *labels* in *table*; out-of-range labels get *fill*."""
+    labels = np.asarray(labels)
+    valid = (labels >= 0) & (labels < len(table))
+    out = np.full(labels.shape, fill, dtype=np.float32)
+    out[valid] = table[labels[valid]]
+    return out
+
+
+def _open_record(filename, shape, order):
+    """Create a single-record ``float32`` Fortran file and map its data."""
+    nbytes = int(np.prod(shape)) * 4
+    marker = np.array([nbytes % 2**32], dtype=np.uint32)
+    with open(filename, "wb") as fh:
+        marker.tofile(fh)
+        fh.truncate(4 + nbytes)
+        fh.seek(4 + nbytes)
+        marker.tofile(fh)
+    return np.memmap(filename, dtype=np.float32, mode="r+", offset=4,
+                     shape=shape, order=order)
+
+
+def property_volumes(
+        labels,
+        materials,
+        out_dir: str = ".",
+        *,
+        properties=DEFAULT_PROPERTIES,
+        perturbations: list = None,
+        dx: float = 1.0,
+        dy: float = 1.0,
+        dz: float = 1.0,
+        order: str = "F",
+        fill: float = np.nan,
+        memory_budget=None,
+    ) -> dict:
+    """Write one ``float32`` property volume per property from a label grid.
+
+    Parameters
+    ----------
+    labels : array_like, shape (nx, ny, nz)
+        Integer label grid, e.g. ``VolumeBuilder.label_grid``, a
+        ``geometry.dat`` memmap from ``open_geometry`` or a ``.npy``
+        memmap.  Only one chunk is read at a time.
+    materials : dict, list or str
+        Per-material values (see :func:`property_table`).
+    out_dir : str, optional
+        Output directory; files are named ``<property>.dat``.
+    properties : sequence of str, optional
+        Properties to write.
+    perturbations : list of dict, optional
+        Stochastic perturbations, each::
+
+            {
+                'label': int,             # material to perturb
+                'property': str,          # e.g. 'porosity'
+                'std': float,             # relative standard deviation
+                'length_scale': float or list of float,  # metres
+                'seed': int,              # optional, default 42
+            }
+
+        The value at each cell of that material is multiplied by
+        ``1 + std * field`` with a unit-variance Gaussian random field.
+        The field is a function of position only, so chunking does not
+        change the result.
+    dx, dy, dz : float, optional
+        Grid spacings in metres (cell coordinates for the random fields).
+    order : {'F', 'C'}, optional
+        Storage order of the output records.  ``'F'`` (column-major) is
+        what the Fortran solver reads directly.
+    fill : float, optional
+        Value for labels without a material entry.
+    memory_budget : int or str, optional
+        Limit for per-chunk temporaries (see ``set_memory_budget``).
+
+    Returns
+    -------
+    volumes : dict
+        ``{property: np.memmap (nx, ny, nz) float32}``, opened read-write.
+    """
+    if order not in ("F", "C"):
+        raise ValueError("order must be 'F' or 'C'.")
+    if labels.ndim != 3:
+        raise ValueError("labels must be 3-D, shape (nx, ny, nz).")
+    tables = property_table(materials, properties, fill)
+
+    fields = {}
+    for spec in perturbations or []:
+        if spec["property"] not in tables:
+            raise ValueError(f"Perturbed property {spec['property']!r} is not "
+                             f"in properties.")
+        model = gs.Gaussian(dim=3, var=1.0, len_scale=spec["length_scale"])
+        srf = gs.SRF(model, seed=spec.get("seed", 42))
+        fields.setdefault(spec["property"], []).append(
+            (int(spec["label"]), float(spec["std"]), srf)
+        )
+
+    shape = tuple(int(n) for n in labels.shape)
+    os.makedirs(out_dir, exist_ok=True)
+    volumes = {
+        prop: _open_record(os.path.join(out_dir, f"{prop}.dat"), shape, order)
+        for prop in properties
+    }
+
+    # Chunk along the slowest axis of the output so writes are contiguous
+    axis = 2 if order == "F" else 0
+    n = shape[axis]
+    per_slice = int(np.prod(shape)) // max(n, 1)
+    itemsize = np.dtype(labels.dtype).itemsize
+    step = slab_size(n, (itemsize + 8 + 4 * len(properties)) * per_slice,
+                     memory_budget)
+    spacing = np.array([dx, dy, dz])
+
+    for a0 in range(0, n, step):
+        a1 = min(a0 + step, n)
+        index = [slice(None)] * 3
+        index[axis] = slice(a0, a1)
+        index = tuple(index)
+        chunk = np.asarray(labels[index])
+        for prop in properties:
+            values = _gather(chunk, tables[prop], fill)
+            for label, std, srf in fields.get(prop, ()):
+                cells = np.nonzero(chunk == label)
+                if cells[0].size == 0:
+                    continue
+                pos = [(c + (a0 if ax == axis else 0)) * spacing[ax]
+                       for ax, c in enumerate(cells)]
+                values[cells] *= 1.0 + std * srf(pos, mesh_type="unstructured")
+            volumes[prop][index] = values
+
+    for volume in volumes.values():
+        volume.flush()
+    print(
+        f"property_volumes: wrote {', '.join(properties)} "
+        f"({shape[0]} x {shape[1]} x {shape[2]}, order {order}) to {out_dir}"
+    )
+    return volumes
@@ -0,0 +1,473 @@
+"""
+Slice browsing and batch slice rendering for large label volumes.
+
+``VolumeBuilder.show_slice`` needs the whole label grid in memory and draws
+one static figure per call.  :class:`SliceViewer` instead works on any
+array-like volume — a ``geometry.dat`` file opened as a memmap with
+:func:`open_geometry`, a ``.npy`` file, a ``LazyDomain`` or a plain array —
+and reads only the plane that is asked for.  Recently viewed planes are kept
+in a bounded LRU cache, and zoomed-out views are served from the
+majority-vote LOD pyramid (see ``label_pyramid``).
+
+:func:`render_slices` renders every Nth plane along all three axes to PNG
+files with a process pool, for automated QA of a finished domain.
+"""
+
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .lod import downsample_labels
+from .memory import parse_bytes, slab_size
+
+# Plane name -> index of the axis held fixed
+_PLANES = {"xy": 2, "xz": 1, "yz": 0}
+_AXIS_NAMES = ("ix", "iy", "iz")
+
+
+# =============================================================================
+# ================================ Volume I/O =================================
+# =============================================================================
+
+def open_geometry(filename: str, shape, mode: str = "r") -> np.memmap:
+    """Open a ``write_geometry`` file as an (nx, ny, nz) ``int32`` memmap.
+
+    Parameters
+    ----------
+    filename : str
+        Fortran unformatted file with a single ``int32`` record.
+    shape : tuple of int
+        Domain shape ``(nx, ny, nz)``; the file does not store it.
+    mode : str, optional
+        ``np.memmap`` mode (``'r'`` or ``'r+'``).
+
+    Returns
+    -------
+    geometry : np.memmap, shape (nx, ny, nz)
+    """
+    nx, ny, nz = (int(n) for n in shape)
+    nbytes = nx * ny * nz * 4
+    marker = np.fromfile(filename, dtype=np.uint32, count=1)
+    # Record markers are uint32, so records over 4 GiB wrap around
+    if marker.size == 0 or int(marker[0]) != nbytes % 2**32:
+        raise ValueError(
+            f"{filename} does not hold one int32 record of shape "
+            f"({nx}, {ny}, {nz})."
+        )
+    if os.path.getsize(filename) != nbytes + 8:
+        raise ValueError(f"{filename} has an unexpected size for {shape}.")
+    return np.memmap(filename, dtype=np.int32, mode=mode, offset=4,
+                     shape=(nx, ny, nz))
+
+
+def _as_volume(source, shape=None):
+    """Array-like (nx, ny, nz) volume from an array, ``.npy`` or ``.dat``."""
+    if isinstance(source, (str, os.PathLike)):
+        if str(source).endswith(".npy"):
+            return np.load(source, mmap_mode="r")
+        if shape is None:
+            raise ValueError("shape is required to open a geometry.dat file.")
+        return open_geometry(source, shape)
+    if source.ndim != 3:
+        raise ValueError("source must be 3-D, shape (nx, ny, nz).")
+    return source
+
+
+def _plane_slice(volume, plane, index):
+    """Dense copy of one plane of *volume*; only that plane is read."""
+    if plane not in _PLANES:
+        raise ValueError("plane must be one of 'xy', 'xz', 'yz'")
+    axis = _PLANES[plane]
+    n = volume.shape[axis]
+    if not 0 <= index < n:
+        raise IndexError(f"index {index} out of range for plane {plane!r}.")
+    key = [slice(None)] * 3
+    key[axis] = index
+    return np.array(volume[tuple(key)])
+
+
+def _label_range(volume, memory_budget=None):
+    """Smallest and largest label, scanning *volume* in x-slabs."""
+    nx, ny, nz = volume.shape
+    itemsize = np.dtype(volume.dtype).itemsize
+    step = slab_size(nx, itemsize * ny * nz, memory_budget)
+    lo, hi = np.inf, -np.inf
+    for i0 in range(0, nx, step):
+        slab = np.asarray(volume[i0:i0 + step])
+        lo, hi = min(lo, slab.min()), max(hi, slab.max())
+    return int(lo), int(hi)
+
+
+# =============================================================================
+# ================================ SliceViewer ================================
+# =============================================================================
+
+class SliceViewer:
+    """Plane-at-a-time viewer for label volumes too large to hold in memory.
+
+    Parameters
+    ----------
+    source : array_like, LazyDomain or str
+        Volume of shape (nx, ny, nz): an array or memmap, a ``LazyDomain``,
+        a ``.npy`` path (memory-mapped) or a ``geometry.dat`` path.
+    shape : tuple of int, optional
+        Domain shape; required for ``geometry.dat`` paths.
+    cache_bytes : int or str, optional
+        Size limit of the LRU cache of extracted planes.
+    levels : dict, optional
+        ``{lod: array}`` of already built pyramid levels.  The dict is used
+        (and extended) in place, so it can be shared with the caller.
+    pyramid_dir : str, optional
+        Directory in which pyramid levels are stored as ``lod<n>.npy``
+        memmaps.  For a file *source* they are reused by later sessions
+        unless older than the file; otherwise they are rebuilt.  By default
+        levels are kept in memory.
+    memory_budget : int or str, optional
+        Limit for pyramid-building temporaries (see ``set_memory_budget``).
+    """
+
+    def __init__(
+            self,
+            source,
+            shape=None,
+            *,
+            cache_bytes="256MB",
+            levels=None,
+            pyramid_dir=None,
+            memory_budget=None,
+        ):
+        self.source = source
+        self.volume = _as_volume(source, shape)
+        self.cache_bytes = parse_bytes(cache_bytes)
+        self.levels = {} if levels is None else levels
+        self.levels[0] = self.volume
+        self.pyramid_dir = pyramid_dir
+        self.memory_budget = memory_budget
+        self._cache = OrderedDict()   # (plane, index, lod) -> 2-D array
+        self._cached_bytes = 0
+
+    @property
+    def shape(self):
+        return self.volume.shape
+
+    def __repr__(self):
+        return (
+            f"SliceViewer(shape={self.shape}, levels={sorted(self.levels)}, "
+            f"cached={len(self._cache)} planes)"
+        )
+
+    # -------------------------
+    # pyramid
+    # -------------------------
+
+    def _stored_level(self, lod, shape):
+        """Open or create the ``lod<n>.npy`` memmap in pyramid_dir."""
+        path = os.path.join(self.pyramid_dir, f"lod{lod}.npy")
+        if os.path.exists(path):
+            fresh = isinstance(self.source, (str, os.PathLike)) and (
+                os.path.getmtime(path) >= os.path.getmtime(self.source)
+            )
+            stored = np.load(path, mmap_mode="r")
+            if fresh and stored.shape == shape:
+                return stored, True
+        os.makedirs(self.pyramid_dir, exist_ok=True)
+        out = np.lib.format.open_memmap(
+            path, mode="w+", dtype=self.volume.dtype, shape=shape
+        )
+        return out, False
+
+    def level(self, lod: int = 0):
+        """Volume at pyramid level *lod* (downsampled by ``2**lod``)."""
+        lod = int(lod)
+        if lod < 0:
+            raise ValueError("lod must be >= 0.")
+        if lod not in self.levels:
+            finer = self.level(lod - 1)
+            shape = tuple(-(-n // 2) for n in finer.shape)
+            out, ready = (None, False)
+            if self.pyramid_dir is not None:
+                out, ready = self._stored_level(lod, shape)
+            if not ready:
+                out = downsample_labels(
+                    finer, 2, out=out, memory_budget=self.memory_budget
+                )
+                if isinstance(out, np.memmap):
+                    out.flush()
+            self.levels[lod] = out
+        return self.levels[lod]
+
+    def pick_lod(self, plane: str, max_pixels: int = 1024**2) -> int:
+        """Finest level whose *plane* has at most *max_pixels* cells."""
+        fixed = _PLANES[plane]
+        cells = np.prod([n for a, n in enumerate(self.shape) if a != fixed])
+        lod = 0
+        while cells > max_pixels and min(self.shape) >> (lod + 1) > 0:
+            lod += 1
+            cells /= 4
+        return lod
+
+    # -------------------------
+    # plane access
+    # -------------------------
+
+    def slice(self, plane: str, index: int, lod: int = 0) -> np.ndarray:
+        """One plane as a 2-D array, served from the LRU cache when possible.
+
+        Parameters
+        ----------
+        plane : {'xy', 'xz', 'yz'}
+            Principal plane (same naming as ``VolumeBuilder.show_slice``).
+        index : int
+            Plane index in full-resolution cells.
+        lod : int, optional
+            Pyramid level to read from; *index* is mapped to ``index >> lod``.
+        """
+        key = (plane, int(index) >> lod, lod)
+        img = self._cache.get(key)
+        if img is not None:
+            self._cache.move_to_end(key)
+            return img
+
+        img = _plane_slice(self.level(lod), plane, key[1])
+        self._cache[key] = img
+        self._cached_bytes += img.nbytes
+        while self._cached_bytes > self.cache_bytes and len(self._cache) > 1:
+            _, old = self._cache.popitem(last=False)
+            self._cached_bytes -= old.nbytes
+        return img
+
+    def clear_cache(self):
+        """Drop all cached planes."""
+        self._cache.clear()
+        self._cached_bytes = 0
+
+    # -------------------------
+    # display
+    # -------------------------
+
+    def _labels(self, plane):
+        fixed = _PLANES[plane]
+        row, col = (_AXIS_NAMES[a] for a in range(3) if a != fixed)
+        return row, col, _AXIS_NAMES[fixed]
+
+    def show(self, plane="xy", index=0, lod=None, max_pixels=1024**2):
+        """Static figure of one plane, like ``VolumeBuilder.show_slice``.
+
+        ``lod=None`` picks the finest level with at most *max_pixels* cells.
+        """
+        import matplotlib.pyplot as plt
+
+        if lod is None:
+            lod = self.pick_lod(plane, max_pixels)
+        img = self.slice(plane, index, lod)
+        row, col, fixed = self._labels(plane)
+        suffix = f", lod={lod}" if lod else ""
+
+        plt.figure(figsize=(6, 5))
+        plt.imshow(img, extent=self._extent(img, lod), interpolation="nearest")
+        plt.title(f"Slice plane={plane}, {fixed}={index}{suffix}")
+        plt.xlabel(row)
+        plt.ylabel(col)
+        plt.tight_layout()
+        plt.show()
+
+    @staticmethod
+    def _extent(img, lod):
+        """imshow extent in full-resolution cell coordinates."""
+        f = 2**lod
+        n0, n1 = img.shape
+        return (-0.5, n1 * f - 0.5, n0 * f - 0.5, -0.5)
+
+    def browse(self, plane="xy", index=0, max_pixels=None):
+        """Interactive viewer with a slice slider.
+
+        The level shown follows the zoom: the finest pyramid level whose
+        visible region has no more cells than the axes has screen pixels
+        (or *max_pixels*, if given) is drawn.
+
+        Returns
+        -------
+        fig : matplotlib.figure.Figure
+            Keep a reference to it so the slider stays responsive.
+        """
+        import matplotlib.pyplot as plt
+        from matplotlib.widgets import Slider
+
+        fixed = _PLANES[plane]
+        row, col, fixed_name = self._labels(plane)
+        vmin, vmax = _label_range(self.level(self.pick_lod(plane)),
+                                  self.memory_budget)
+
+        fig, ax = plt.subplots(figsize=(7, 6))
+        fig.subplots_adjust(bottom=0.15)
+        slider_ax = fig.add_axes([0.15, 0.03, 0.7, 0.03])
+        slider = Slider(slider_ax, fixed_name, 0, self.shape[fixed] - 1,
+                        valinit=index, valstep=1)
+        state = {"lod": self.pick_lod(plane, max_pixels or 1024**2)}
+        img = self.slice(plane, index, state["lod"])
+        im = ax.imshow(img, extent=self._extent(img, state["lod"]),
+                       interpolation="nearest", vmin=vmin, vmax=vmax)
+        ax.set_xlabel(row)
+        ax.set_ylabel(col)
+
+        def _draw(*_):
+            k = int(slider.val)
+            data = self.slice(plane, k, state["lod"])
+            im.set_data(data)
+            im.set_extent(self._extent(data, state["lod"]))
+            suffix = f", lod={state['lod']}" if state["lod"] else ""
+            ax.set_title(f"Slice plane={plane}, {fixed_name}={k}{suffix}")
+            fig.canvas.draw_idle()
+
+        def _rezoom(_ax):
+            x0, x1 = sorted(ax.get_xlim())
+            y0, y1 = sorted(ax.get_ylim())
+            width, height = ax.get_window_extent().size
+            budget = max_pixels or width * height
+            visible = (x1 - x0) * (y1 - y0)
+            lod = 0
+            while visible / 4**lod > budget and min(self.shape) >> (lod + 1):
+                lod += 1
+            if lod != state["lod"]:
+                state["lod"] = lod
+                xlim, ylim = ax.get_xlim(), ax.get_ylim()
+                _draw()
+                ax.set_xlim(xlim)
+                ax.set_ylim(ylim)
+
+        slider.on_changed(_draw)
+        ax.callbacks.connect("xlim_changed", _rezoom)
+        _draw()
+        plt.show()
+        return fig
+
+
+# =============================================================================
+# ============================== Batch rendering ==============================
+# =============================================================================
+
+_WORKER_VOLUME = None
+
+
+def _init_render_worker(volume):
+    global _WORKER_VOLUME
+    if isinstance(volume, tuple):   # memmap spec, reopened per process
+        filename, dtype, shape, offset, order = volume
+        volume = np.memmap(filename, dtype=dtype, mode="r", shape=shape,
+                           offset=offset, order=order)
+    _WORKER_VOLUME = volume
+
+
+def _render_planes(tasks, lod, out_dir, cmap, vmin, vmax, dpi):
+    """Render ``(plane, index)`` tasks from the worker's volume to PNGs."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    paths = []
+    for plane, index in tasks:
+        img = _plane_slice(_WORKER_VOLUME, plane, index >> lod)
+        fixed = _PLANES[plane]
+        row, col = (_AXIS_NAMES[a] for a in range(3) if a != fixed)
+        suffix = f", lod={lod}" if lod else ""
+
+        fig = Figure(figsize=(6, 5))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.imshow(img, extent=SliceViewer._extent(img, lod), cmap=cmap,
+                  vmin=vmin, vmax=vmax, interpolation="nearest")
+        ax.set_title(
+            f"Slice plane={plane}, {_AXIS_NAMES[fixed]}={index}{suffix}"
+        )
+        ax.set_xlabel(row)
+        ax.set_ylabel(col)
+        fig.tight_layout()
+        path = os.path.join(out_dir, f"{plane}_{index:05d}.png")
+        fig.savefig(path, dpi=dpi)
+        paths.append(path)
+    return paths
+
+
+def render_slices(
+        source,
+        out_dir: str = "slices",
+        *,
+        shape=None,
+        every: int = 10,
+        planes=("xy", "xz", "yz"),
+        lod: int = 0,
+        workers: int = None,
+        cmap: str = "viridis",
+        dpi: int = 100,
+        pyramid_dir: str = None,
+        memory_budget=None,
+    ) -> list:
+    """Render every *every*-th plane of each orientation to PNG files.
+
+    Parameters
+    ----------
+    source : array_like, LazyDomain, SliceViewer or str
+        Volume to render (see :class:`SliceViewer`).
+    out_dir : str, optional
+        Output directory; files are named ``<plane>_<index>.png``.
+    shape : tuple of int, optional
+        Domain shape; required for ``geometry.dat`` paths.
+    every : int, optional
+        Plane stride in full-resolution cells.
+    planes : sequence of {'xy', 'xz', 'yz'}, optional
+        Orientations to render.
+    lod : int, optional
+        Pyramid level to render from.
+    workers : int, optional
+        Number of worker processes (default: ``os.cpu_count()``).
+    cmap : str, optional
+        Matplotlib colormap.  All images share one label colour scale.
+    dpi : int, optional
+        PNG resolution.
+    pyramid_dir, memory_budget : optional
+        Forwarded to :class:`SliceViewer`.
+
+    Returns
+    -------
+    paths : list of str
+        Written PNG files.
+    """
+    viewer = source if isinstance(source, SliceViewer) else SliceViewer(
+        source, shape, pyramid_dir=pyramid_dir, memory_budget=memory_budget
+    )
+    volume = viewer.level(lod)
+    vmin, vmax = _label_range(volume, memory_budget)
+
+    tasks = [
+        (plane, index)
+        for plane in planes
+        for index in range(0, viewer.shape[_PLANES[plane]], max(int(every), 1))
+    ]
+    if not tasks:
+        return []
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Memmaps are reopened by each worker instead of pickled
+    if isinstance(volume, np.memmap) and volume.filename is not None:
+        order = "C" if volume.flags.c_contiguous else "F"
+        spec = (volume.filename, volume.dtype, volume.shape, volume.offset,
+                order)
+    else:
+        spec = volume
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    batches = [tasks[w::workers] for w in range(workers)]
+    paths = []
+    with ProcessPoolExecutor(workers, initializer=_init_render_worker,
+                             initargs=(spec,)) as pool:
+        futures = [
+            pool.submit(_render_planes, batch, lod, out_dir, cmap,
+                        vmin, vmax, dpi)
+            for batch in batches
+        ]
+        for fut in futures:
+            paths.extend(fut.result())
+
+    print(f"render_slices: wrote {len(paths)} PNGs to {out_dir}")
+    return paths
@@ -0,0 +1,95 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("trimesh")
+
+from classes import VolumeBuilder
+
+
+def _write_sheet(path):
+    """Open vertical sheet on the cell face x = 5, spanning y 2..8, z 1..8."""
+    path.write_text(
+        "o crevasse\n"
+        "v 5 2 1\nv 5 8 1\nv 5 8 8\nv 5 2 8\n"
+        "f 1 2 3\nf 1 3 4\n"
+    )
+
+
+def _builder(path, **kwargs):
+    builder = VolumeBuilder(
+        obj_path=str(path),
+        priority={"crevasse": 1},
+        x_min=0.5, x_max=9.5, dx=1.0,
+        y_min=0.5, y_max=9.5, dy=1.0,
+        z_min=0.5, z_max=9.5, dz=1.0,
+        methods={"crevasse": "surface"},
+        **kwargs,
+    )
+    # A single-object OBJ loads as a bare mesh; give it its tag name
+    builder.geoms = {"crevasse": next(iter(builder.geoms.values()))}
+    builder.label_for_name = builder._build_label_map()
+    return builder
+
+
+def test_surface_method_overrides_lattice_fill(tmp_path):
+    path = tmp_path / "sheet.obj"
+    _write_sheet(path)
+
+    grid = _builder(path, lattice_fill=True).label_domain()
+    reference = _builder(path, lattice_fill=False).label_domain()
+
+    assert grid.any()
+    np.testing.assert_array_equal(grid, reference)
+    # Only the two cell layers either side of the sheet are touched
+    assert set(np.nonzero(grid)[0]) == {4, 5}
+
+
+def test_open_sheet_is_not_lattice_closed(tmp_path):
+    path = tmp_path / "sheet.obj"
+    _write_sheet(path)
+
+    builder = _builder(path)
+    mesh = builder.geoms["crevasse"]
+    lattice = builder._lattice_coords(mesh)
+
+    assert lattice is not None
+    assert not builder._lattice_closed(lattice, mesh.faces)
+
+
+def test_primitive_without_grid_points():
+    import primitives
+
+    labels = np.zeros((4, 4, 4), dtype=np.int32)
+    axes = (np.arange(4.0),) * 3
+    sphere = primitives.Primitives("sphere", [[1.5, 1.5, 1.5]], [0.6])
+    assert primitives.rasterize_primitives(labels, axes, sphere, verbose=False) == 0
+    # A batch that within filters down to nothing
+    covering = primitives.Primitives("sphere", [[1.0, 1.0, 1.0]], [1.0])
+    assert primitives.rasterize_primitives(labels, axes, covering,
+                                           within={7}, verbose=False) == 0
+    assert not labels.any()
+
+
+def test_primitives_independent_of_batch_size(monkeypatch):
+    import primitives
+
+    axes = (np.arange(20.0),) * 3
+    base = np.zeros((20, 20, 20), dtype=np.int32)
+    base[:, :, 10:] = 5
+    population = (
+        primitives.Primitives("sphere", [[9.0, 9.0, 9.0]], [8.0], label=1)
+        + primitives.Primitives("box", [[12.0, 12.0, 12.0]], [4.0], label=2)
+    )
+
+    results = []
+    for batch in (2**20, 7):
+        monkeypatch.setattr(primitives, "_PRIMITIVE_BATCH", batch)
+        labels = base.copy()
+        primitives.rasterize_primitives(labels, axes, population,
+                                        within={0}, verbose=False)
+        results.append(labels)
+
+    np.testing.assert_array_equal(results[0], results[1])
+    # The box overlaps the sphere and wins; cells labeled 5 stay untouched
+    assert results[1][12, 12, 9] == 2
+    assert (results[1][:, :, 10:] == 5).all()
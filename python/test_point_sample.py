@@ -1,11 +1,19 @@
+import os
+import sys
+
 import bpy
 import bmesh
 import numpy as np
 from mathutils import Vector, bvhtree
 
+# Priority resolution and slab loop are shared with the standalone backend
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from point_sample import sample_volume, expand_colors
+
 class VolumePointSample:
     def __init__(self, obj, layer_index):
         self.obj = obj
+        self.name = obj.name
         self.layer = layer_index.get(obj.name, 0)
         
         # Local bmesh and BVH
@@ -14,6 +22,12 @@ class VolumePointSample:
         bm.from_mesh(me)
         bm.verts.ensure_lookup_table()
         self.bvh = bvhtree.BVHTree.FromBMesh(bm)
+        bm.free()
+        
+        # World -> local transform, inverted once per object
+        inv = np.array(obj.matrix_world.inverted(), dtype=float)
+        self.rotation = inv[:3, :3]
+        self.translation = inv[:3, 3]
         
         # Simple material color (per object)
         self.base_color = self._get_base_color()
@@ -36,12 +50,28 @@ class VolumePointSample:
     def sample_at_world_point(self, p_world):
         """Return (hit, distance, color) for this object at p_world."""
         # Transform point into object local space
-        p_local = self.obj.matrix_world.inverted() @ p_world
+        p_local = self.rotation @ np.asarray(p_world, dtype=float) + self.translation
         hit = self.bvh.find_nearest(p_local)
         if hit is None:
             return False, None, None
         loc, normal, index, dist = hit
         return True, dist, self.base_color
+    
+    def sample_points(self, points):
+        """
+        Nearest-surface distance at (N, 3) world points.
+        
+        Returns (hit, dist): a boolean mask and float distances (inf where
+        the BVH has no hit).
+        """
+        local = points @ self.rotation.T + self.translation
+        dist = np.full(len(local), np.inf)
+        find_nearest = self.bvh.find_nearest
+        for i, p in enumerate(local.tolist()):
+            hit = find_nearest(p)
+            if hit is not None:
+                dist[i] = hit[3]
+        return np.isfinite(dist), dist
 
 
 
@@ -84,43 +114,13 @@ Nx = int(dims.x / step.x) + 1
 Ny = int(dims.y / step.y) + 1
 Nz = int(dims.z / step.z) + 1
 
-colors = np.zeros((Nx, Ny, Nz, 3), dtype=float)
+xs = origin.x + step.x * np.arange(Nx)
+ys = origin.y + step.y * np.arange(Ny)
+zs = origin.z + step.z * np.arange(Nz)
 
 # -----------------------------
 # MAIN SAMPLING LOOP
 # -----------------------------
-ind = 0
-for ix in range(Nx):
-    x = origin.x + ix * step.x
-    for iy in range(Ny):
-        y = origin.y + iy * step.y
-        for iz in range(Nz):
-            print(ind)
-            ind += 1
-            z = origin.z + iz * step.z
-            p = Vector((x, y, z))
-            best_hit = False
-            best_dist = None
-            best_layer = None
-            best_color = (0.0, 0.0, 0.0)
-            # Check all objects at this point
-            for t in targets:
-                hit, dist, col = t.sample_at_world_point(p)
-                if not hit:
-                    continue
-                if not best_hit:
-                    best_hit = True
-                    best_dist = dist
-                    best_layer = t.layer
-                    best_color = col
-                else:
-                    # Priority: higher layer; tie-breaker: smaller distance
-                    if t.layer > best_layer:
-                        best_layer = t.layer
-                        best_dist = dist
-                        best_color = col
-                    elif t.layer == best_layer and dist < best_dist:
-                        best_dist = dist
-                        best_color = col
-            colors[ix, iy, iz, :] = best_color
-
+# indices: uint8/uint16 palette rows (0 = nothing hit); RGB on demand only
+indices, palette = sample_volume(targets, xs, ys, zs)
+colors_mid_z = expand_colors(indices[:, :, Nz // 2], palette)